@@ -0,0 +1,3 @@
+"""
+data_analysis.py 使用的数据加载与统计组件
+"""
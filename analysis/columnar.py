@@ -0,0 +1,298 @@
+"""
+列式分析缓存
+把 artists.json / songs.json 编译成一组按列存放的二进制数组（目录默认 output/analysis_cache/columnar），
+分析时用 np.memmap 直接映射，不再逐行解析 JSON、逐首清洗歌词：
+  字符串列      <列名>.data（UTF-8 字节）+ <列名>.offsets（int64，n+1 个起点）
+  歌词码点      lyrics.codepoints：全部歌曲去空白后的非空歌词行首尾相接（uint32，见 analysis/lyric_stats.py）
+  行起点        lyrics.line_starts：每行在码点数组中的起点
+  歌曲行号      lyrics.song_line_starts：每首歌第一行的行号（n+1 个，没有歌词的歌前后相等）
+  清洗后的歌词  clean 列，分词直接使用（见 analysis/tokens.py）；has_lyrics 标记原始记录是否有歌词
+manifest.json 记录各列的类型和长度，以及源文件的大小、mtime 和 sha1：大小和 mtime 都没变时直接使用；
+变了再算 sha1，内容相同只更新 mtime，不同才重新编译。编译先写临时目录，完成后整体替换。
+
+用法: python -m analysis.columnar [--force]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from analysis.loader import iter_jsonl
+from analysis.lyric_stats import LyricArrays, song_lines
+from analysis.tokens import TOKENIZER_VERSION, clean_lyrics
+
+FORMAT_VERSION = f"1/tokenizer {TOKENIZER_VERSION}"  # 列的含义或清洗规则变化时整个缓存重建
+BATCH_SIZE = 5000
+
+SONG_STRINGS = ("name", "artist_name", "source_url", "clean")
+ARTIST_STRINGS = ("name", "biography", "source_url")
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_info(path):
+    path = Path(path)
+    st = path.stat()
+    return {"path": str(path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _ColumnWriter:  # 逐批追加写入一列，close() 返回类型和长度，记进 manifest
+    def __init__(self, path, dtype):
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._file = open(path, "wb")
+
+    def append(self, values):
+        array = np.asarray(values, dtype=self.dtype)
+        self._file.write(array.tobytes())
+        self.length += len(array)
+
+    def append_bytes(self, data):  # 只用于 uint8 列
+        self._file.write(data)
+        self.length += len(data)
+
+    def close(self):
+        self._file.close()
+        return {"dtype": self.dtype.str, "length": self.length}
+
+
+class _StringWriter:  # 字符串列：UTF-8 数据 + int64 起点
+    def __init__(self, root, name):
+        self.data = _ColumnWriter(root / f"{name}.data", np.uint8)
+        self.offsets = _ColumnWriter(root / f"{name}.offsets", np.int64)
+        self.offsets.append([0])
+        self._end = 0
+
+    def append(self, values):
+        encoded = [v.encode("utf-8", "surrogatepass") for v in values]
+        self.data.append_bytes(b"".join(encoded))
+        ends = self._end + np.cumsum([len(e) for e in encoded], dtype=np.int64)
+        self.offsets.append(ends)
+        if len(ends):
+            self._end = int(ends[-1])
+
+    def close(self):
+        return {"data": self.data.close(), "offsets": self.offsets.close()}
+
+
+def _compile_songs(path, root):
+    strings = {name: _StringWriter(root, f"songs.{name}") for name in SONG_STRINGS}
+    has_lyrics = _ColumnWriter(root / "songs.has_lyrics", np.uint8)
+    codepoints = _ColumnWriter(root / "lyrics.codepoints", "<u4")
+    line_starts = _ColumnWriter(root / "lyrics.line_starts", np.int64)
+    song_line_starts = _ColumnWriter(root / "lyrics.song_line_starts", np.int64)
+    song_line_starts.append([0])
+    n_lines = n_chars = 0
+    for batch in _batches(iter_jsonl(path), BATCH_SIZE):
+        cleaned = [clean_lyrics(song) for song in batch]
+        for name in ("name", "artist_name", "source_url"):
+            strings[name].append([str(song.get(name) or "") for song in batch])
+        strings["clean"].append([text or "" for text in cleaned])
+        has_lyrics.append([text is not None for text in cleaned])
+        lines_per_song = [song_lines(song) for song in batch]
+        lines = [line for current in lines_per_song for line in current]
+        codepoints.append(np.frombuffer("".join(lines).encode("utf-32-le", "surrogatepass"), dtype="<u4"))
+        lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+        line_starts.append(n_chars + np.cumsum(lengths, dtype=np.int64) - lengths)
+        song_line_starts.append(n_lines + np.cumsum([len(c) for c in lines_per_song], dtype=np.int64))
+        n_lines += len(lines)
+        n_chars += int(lengths.sum())
+    columns = {f"songs.{name}": writer.close() for name, writer in strings.items()}
+    columns["songs.has_lyrics"] = has_lyrics.close()
+    columns["lyrics.codepoints"] = codepoints.close()
+    columns["lyrics.line_starts"] = line_starts.close()
+    columns["lyrics.song_line_starts"] = song_line_starts.close()
+    return columns
+
+
+def _compile_artists(path, root):
+    strings = {name: _StringWriter(root, f"artists.{name}") for name in ARTIST_STRINGS}
+    for batch in _batches(iter_jsonl(path), BATCH_SIZE):
+        for name in ARTIST_STRINGS:
+            strings[name].append([str(artist.get(name) or "") for artist in batch])
+    return {f"artists.{name}": writer.close() for name, writer in strings.items()}
+
+
+def compile_dataset(artists_path, songs_path, root):
+    """
+    编译列式缓存，先写 root 旁边的临时目录，完成后替换 root。
+    源文件的大小/mtime/sha1 在读取之前记录：编译期间文件被追加时，下次打开会发现变化并重建
+    """
+    root = Path(root)
+    tmp = root.with_name(root.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        sources = {}
+        for kind, path in (("artists", artists_path), ("songs", songs_path)):
+            sources[kind] = {**_source_info(path), "sha1": file_sha1(path)}
+        columns = {**_compile_artists(artists_path, tmp), **_compile_songs(songs_path, tmp)}
+        manifest = {"version": FORMAT_VERSION, "sources": sources, "columns": columns}
+        (tmp / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        old = root.with_name(root.name + ".old")
+        if root.exists():
+            os.replace(root, old)
+        os.replace(tmp, root)
+        shutil.rmtree(old, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return ColumnarDataset(root)
+
+
+def is_current(root, artists_path, songs_path):
+    """
+    缓存是否与源文件一致。大小和 mtime 都没变视为一致；否则比较 sha1，内容相同时把新的 mtime 写回 manifest
+    """
+    manifest_path = Path(root) / "manifest.json"
+    if not manifest_path.exists():
+        return False
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("version") != FORMAT_VERSION:
+        return False
+    touched = False
+    for kind, path in (("artists", artists_path), ("songs", songs_path)):
+        recorded = manifest["sources"].get(kind)
+        current = _source_info(path)
+        if recorded is None or recorded["path"] != current["path"]:
+            return False
+        if recorded["size"] == current["size"] and recorded["mtime_ns"] == current["mtime_ns"]:
+            continue
+        if recorded["size"] != current["size"] or recorded["sha1"] != file_sha1(path):
+            return False
+        recorded["mtime_ns"] = current["mtime_ns"]
+        touched = True
+    if touched:
+        manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return True
+
+
+def open_dataset(artists_path, songs_path, root, rebuild=False):  # 打开列式缓存，源文件变了（或 rebuild=True）时先重新编译
+    if rebuild or not is_current(root, artists_path, songs_path):
+        print(f"正在编译列式缓存: {root}")
+        return compile_dataset(artists_path, songs_path, root)
+    return ColumnarDataset(root)
+
+
+class StringColumn:
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].tobytes().decode("utf-8", "surrogatepass")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class ColumnarDataset:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.manifest = json.loads((self.root / "manifest.json").read_text(encoding="utf-8"))
+        self.songs = ColumnarSongs(self)
+        self.artists = ColumnarArtists(self)
+
+    def _map(self, filename, info):  # 只读映射一个数组文件；空文件不能 mmap，返回空数组
+        if info["length"] == 0:
+            return np.zeros(0, dtype=info["dtype"])
+        return np.memmap(self.root / filename, dtype=info["dtype"], mode="r", shape=(info["length"],))
+
+    def column(self, name):
+        return self._map(name, self.manifest["columns"][name])
+
+    def strings(self, name):
+        info = self.manifest["columns"][name]
+        return StringColumn(self._map(f"{name}.data", info["data"]), self._map(f"{name}.offsets", info["offsets"]))
+
+
+class ColumnarSongs:
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.name = dataset.strings("songs.name")
+        self.artist_name = dataset.strings("songs.artist_name")
+        self.source_url = dataset.strings("songs.source_url")
+        self.clean = dataset.strings("songs.clean")
+        self.has_lyrics = dataset.column("songs.has_lyrics")
+
+    def __len__(self):
+        return len(self.name)
+
+    def iter_clean_texts(self):  # 与对每条记录调用 clean_lyrics 相同，跳过没有歌词的歌
+        for index in np.flatnonzero(self.has_lyrics):
+            yield self.clean[index]
+
+    def iter_lyric_arrays(self, batch_size=BATCH_SIZE):  # 按批产出 LyricArrays（码点为映射数组的切片），没有歌词行的歌不包含在内
+        cp = self.dataset.column("lyrics.codepoints")
+        line_starts = self.dataset.column("lyrics.line_starts")
+        song_line_starts = self.dataset.column("lyrics.song_line_starts")
+        n_lines = len(line_starts)
+        for first in range(0, len(self), batch_size):
+            last = min(first + batch_size, len(self))
+            starts = np.asarray(song_line_starts[first:last + 1])
+            line_first, line_last = int(starts[0]), int(starts[-1])
+            nonempty = starts[1:] > starts[:-1]
+            char_first = int(line_starts[line_first]) if line_first < n_lines else len(cp)
+            char_last = int(line_starts[line_last]) if line_last < n_lines else len(cp)
+            yield LyricArrays(
+                cp[char_first:char_last],
+                np.asarray(line_starts[line_first:line_last]) - char_first,
+                starts[:-1][nonempty] - line_first,
+            )
+
+
+class ColumnarArtists:
+    def __init__(self, dataset):
+        self.name = dataset.strings("artists.name")
+        self.biography = dataset.strings("artists.biography")
+        self.source_url = dataset.strings("artists.source_url")
+
+    def __len__(self):
+        return len(self.name)
+
+    def __iter__(self):  # 逐条产出 dict，没有简介的歌手不含 biography 字段
+        for name, biography, source_url in zip(self.name, self.biography, self.source_url):
+            artist = {"name": name, "source_url": source_url}
+            if biography:
+                artist["biography"] = biography
+            yield artist
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把爬虫输出编译成列式分析缓存")
+    parser.add_argument("--artists", default="output/artists.json")
+    parser.add_argument("--songs", default="output/songs.json")
+    parser.add_argument("--root", default="output/analysis_cache/columnar")
+    parser.add_argument("--force", action="store_true", help="忽略 manifest，强制重新编译")
+    args = parser.parse_args()
+    dataset = open_dataset(args.artists, args.songs, args.root, rebuild=args.force)
+    print(f"{dataset.root}: {len(dataset.artists)} 个歌手, {len(dataset.songs)} 首歌曲")
+
+
+if __name__ == "__main__":
+    main()
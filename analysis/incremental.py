@@ -0,0 +1,122 @@
+"""
+增量分析状态
+spider 只会在 songs.json / artists.json 末尾追加记录，增量模式只处理上次分析之后新增的行：
+每个源文件记一个高水位（已处理的完整行的字节偏移），中间结果保存成可以直接合并的形式：
+  歌曲  词频 Counter、中文/英文平均句长直方图各箱的歌曲数（以及落入直方图前的歌曲总数）
+  歌手  每个有获奖词汇的歌手的 (姓名, 次数)
+图表每次都从合并后的状态重新生成。
+源文件被整体重写（compact、重新解析后替换、手动编辑）时，通过 inode 和高水位之前 4KB 的 sha1 发现，
+对应的那部分状态清空后从头处理；分析配置（停用词、直方图分箱、获奖词汇）的指纹变化时全部清空。
+状态保存为 JSON，先写临时文件再替换。
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from analysis.loader import JsonlRange, complete_size
+
+STATE_VERSION = 1
+CHECK_BYTES = 4096
+
+
+def fingerprint(*parts):  # 分析配置的指纹，parts 需要能被 json 序列化
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _tail_sha1(path, offset):  # 高水位之前最后 CHECK_BYTES 字节的 sha1，用来发现文件被重写
+    with open(path, "rb") as f:
+        start = max(0, offset - CHECK_BYTES)
+        f.seek(start)
+        return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+class AnalysisState:
+    def __init__(self, path, config, zh_bins, en_bins):
+        self.path = Path(path)
+        self.config = config
+        self.zh_bins = np.asarray(zh_bins, dtype=np.float64)
+        self.en_bins = np.asarray(en_bins, dtype=np.float64)
+        self.marks = {}
+        self._pending = {}
+        self.reset("songs")
+        self.reset("artists")
+        if self.path.exists():
+            self._load()
+
+    def reset(self, kind):  # 清空某个源文件对应的状态，下次从文件开头处理
+        self.marks.pop(kind, None)
+        if kind == "songs":
+            self.word_counts = Counter()
+            self.zh_hist = np.zeros(len(self.zh_bins) - 1, dtype=np.int64)
+            self.en_hist = np.zeros(len(self.en_bins) - 1, dtype=np.int64)
+            self.zh_songs = self.en_songs = 0
+        else:
+            self.award_counts = []
+
+    def _load(self):
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if data.get("version") != STATE_VERSION or data.get("config") != self.config:
+            print("分析配置已变化，增量状态重新计算")
+            return
+        self.marks = data["marks"]
+        self.word_counts = Counter(data["word_counts"])
+        self.zh_hist = np.asarray(data["zh_hist"], dtype=np.int64)
+        self.en_hist = np.asarray(data["en_hist"], dtype=np.int64)
+        self.zh_songs = data["zh_songs"]
+        self.en_songs = data["en_songs"]
+        self.award_counts = [{"name": name, "count": count} for name, count in data["award_counts"]]
+
+    def save(self):
+        data = {
+            "version": STATE_VERSION,
+            "config": self.config,
+            "marks": self.marks,
+            "word_counts": dict(self.word_counts),
+            "zh_hist": self.zh_hist.tolist(),
+            "en_hist": self.en_hist.tolist(),
+            "zh_songs": self.zh_songs,
+            "en_songs": self.en_songs,
+            "award_counts": [[a["name"], a["count"]] for a in self.award_counts],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def pending(self, kind, path):
+        """
+        返回该源文件上次高水位之后新增的完整行（JsonlRange）。文件被重写过时先清空对应状态、从头开始。
+        范围的终点在这里确定，之后追加的行留给下一次；commit() 之后高水位才前移
+        """
+        path = Path(path)
+        st = path.stat()
+        end = complete_size(path)
+        mark = self.marks.get(kind)
+        if mark is not None:
+            rewritten = (
+                mark["ino"] != st.st_ino
+                or mark["offset"] > end
+                or mark["check"] != _tail_sha1(path, mark["offset"])
+            )
+            if rewritten:
+                print(f"{path} 已被重写，{kind} 的增量状态从头计算")
+                self.reset(kind)
+                mark = None
+        start = mark["offset"] if mark else 0
+        self._pending[kind] = {"ino": st.st_ino, "offset": end, "check": _tail_sha1(path, end)}
+        return JsonlRange(path, start, end)
+
+    def add_line_lengths(self, zh_avg_lengths, en_avg_lengths):  # 合并一批歌曲的平均句长
+        self.zh_hist += np.histogram(zh_avg_lengths, bins=self.zh_bins)[0]
+        self.en_hist += np.histogram(en_avg_lengths, bins=self.en_bins)[0]
+        self.zh_songs += len(zh_avg_lengths)
+        self.en_songs += len(en_avg_lengths)
+
+    def commit(self):  # 新增记录都已合并：前移高水位并保存
+        self.marks.update(self._pending)
+        self._pending.clear()
+        self.save()
@@ -0,0 +1,151 @@
+"""
+多关键词计数（Aho-Corasick 自动机）
+关键词表只建一次自动机，每段文本扫描一遍就找出全部关键词的出现位置，
+不再对每个关键词各调一次 str.count。计数口径与逐个 str.count 求和完全相同：
+  - 不同关键词互相包含时各自计数（"awards" 里同时算 "award" 和 "awards"）
+  - 同一关键词的出现不重叠，从左到右贪心匹配（"aa" 在 "aaa" 中算 1 次），与 str.count 一致
+  - 关键词表中重复的词按重复次数计
+装了 pyahocorasick 时用它的 C 实现扫描，否则用这里的纯 Python 自动机，结果相同。
+文本很多时可以分块交给进程池（iter_counts 的 workers 参数），自动机在每个子进程初始化时传入一次。
+"""
+import os
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import ahocorasick
+except ImportError:  # 可选依赖
+    ahocorasick = None
+
+
+def _has_border(word):  # 真前缀等于真后缀时同一个词的两次出现可能重叠
+    return any(word[:i] == word[-i:] for i in range(1, len(word)))
+
+
+class KeywordMatcher:
+    def __init__(self, keywords, lower=True):
+        self.lower = lower
+        weights = Counter(k.lower() if lower else k for k in keywords)
+        if '' in weights:
+            raise ValueError("关键词不能为空字符串")
+        self.keywords = list(weights)
+        self.weights = [weights[k] for k in self.keywords]
+        self.lengths = [len(k) for k in self.keywords]
+        self.overlapping = [_has_border(k) for k in self.keywords]
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for index, word in enumerate(self.keywords):
+                self._automaton.add_word(word, index)
+            self._automaton.make_automaton()
+            return
+        self._automaton = None
+        # 字典树：goto[state] 为 {字符: 下一状态}，output[state] 为在该状态结束的关键词编号
+        goto = [{}]
+        output = [[]]
+        for index, word in enumerate(self.keywords):
+            state = 0
+            for ch in word:
+                if ch not in goto[state]:
+                    goto.append({})
+                    output.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            output[state].append(index)
+        # 按层次遍历补全失配指针，并把每个状态展开成完整的转移表（DFA），扫描时每个字符只查一次字典
+        delta = [None] * len(goto)
+        fail = [0] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state] = output[state] + output[fail[state]]
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(child)
+        self._delta = delta
+        self._output = [tuple(o) for o in output]
+        # 关键词只由这些字符组成，匹配必然落在它们连成的片段内；片段之外的字符交给正则在 C 层跳过
+        alphabet = sorted(set(''.join(self.keywords)))
+        self._runs = re.compile('[' + ''.join(re.escape(ch) for ch in alphabet) + ']+')
+
+    def __reduce__(self):  # 传给子进程时只传关键词表，在子进程中重建自动机
+        keywords = [k for k, w in zip(self.keywords, self.weights) for _ in range(w)]
+        return KeywordMatcher, (keywords, self.lower)
+
+    def _matches(self, text):  # 产出全部（可重叠的）出现位置 (结束位置, 关键词编号)，按结束位置递增
+        if self._automaton is not None:
+            for end, index in self._automaton.iter(text):
+                yield end + 1, index
+            return
+        delta, output = self._delta, self._output
+        for run in self._runs.finditer(text):
+            state = 0
+            for pos, ch in enumerate(run.group(), run.start() + 1):
+                state = delta[state][ch] if ch in delta[state] else 0
+                if output[state]:
+                    for index in output[state]:
+                        yield pos, index
+
+    def count_by_keyword(self, text):  # {关键词: 出现次数}，不含未出现的关键词
+        if self.lower:
+            text = text.lower()
+        hits = [0] * len(self.keywords)
+        last_end = {}  # 可能自身重叠的关键词上一次计数的结束位置
+        for end, index in self._matches(text):
+            if self.overlapping[index]:
+                if end - self.lengths[index] < last_end.get(index, 0):
+                    continue
+                last_end[index] = end
+            hits[index] += 1
+        return {self.keywords[i]: n * self.weights[i] for i, n in enumerate(hits) if n}
+
+    def count(self, text):  # 全部关键词出现次数之和
+        return sum(self.count_by_keyword(text).values())
+
+
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _count_chunk(texts):  # 在子进程中执行
+    return [_worker_matcher.count(text) for text in texts]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_counts(matcher, items, key=None, workers=1, chunk_size=200):
+    """
+    按输入顺序产出 (item, 关键词总数)，key 从 item 中取出文本（默认 item 本身就是文本）。
+    workers > 1 时分块交给进程池（None 为 CPU 核数），只把文本传给子进程，同时在途的块数为进程数的两倍
+    """
+    key = key or (lambda item: item)
+    if workers == 1:
+        for item in items:
+            yield item, matcher.count(key(item))
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matcher,)) as pool:
+        pending = deque()
+        for chunk in _chunks(items, chunk_size):
+            pending.append((chunk, pool.submit(_count_chunk, [key(item) for item in chunk])))
+            while len(pending) >= workers * 2 or (pending and pending[0][1].done()):
+                chunk_done, future = pending.popleft()
+                yield from zip(chunk_done, future.result())
+        while pending:
+            chunk_done, future = pending.popleft()
+            yield from zip(chunk_done, future.result())
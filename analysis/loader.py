@@ -0,0 +1,117 @@
+"""
+爬虫输出的流式读取
+spider 把 artists.json / songs.json 写成每行一条记录的 NDJSON（见 crawler/writer.py），
+这里逐行解码、逐条产出，内存占用与文件大小无关。装了 orjson 时用它解码，否则退回标准库 json。
+爬虫运行中读取时，末尾可能有写到一半的行，无法解析的行直接跳过。
+"""
+import json
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+_DECODE_ERRORS = (ValueError, UnicodeDecodeError)  # JSONDecodeError 都是 ValueError 的子类
+
+
+def _loads(line):  # orjson 拒绝孤立的代理字符（\ud800 之类），标准库可以解析，这种行退回 json.loads
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except _DECODE_ERRORS:
+            pass
+    return json.loads(line)
+
+
+def iter_jsonl(path):  # 逐条产出文件中的记录（dict），空行和损坏的行跳过
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()[:1]
+        f.seek(0)
+        if head == b"[":  # 兼容旧的整体 JSON 数组格式，只能一次性读入
+            yield from json.load(f)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = _loads(line)
+            except _DECODE_ERRORS:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def complete_size(path):  # 文件中完整行（以换行结尾）的总字节数，末尾写到一半的行不算
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        pos = size
+        while pos > 0:
+            step = min(64 * 1024, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b"\n")
+            if idx != -1:
+                return pos + idx + 1
+    return 0
+
+
+def iter_jsonl_range(path, start, end):  # 逐条产出 [start, end) 字节范围内的记录，start/end 必须落在行边界上
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            pos += len(line)
+            if pos > end:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = _loads(line)
+            except _DECODE_ERRORS:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+class JsonlFile:
+    """
+    NDJSON 文件的惰性视图：每次迭代都重新从头流式读取，可以被多个分析依次遍历
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def __iter__(self):
+        return iter_jsonl(self.path)
+
+    def __repr__(self):
+        return f"JsonlFile({str(self.path)!r})"
+
+    def exists(self):
+        return self.path.exists()
+
+    def size(self):  # 文件字节数，不存在时为 0
+        return self.path.stat().st_size if self.path.exists() else 0
+
+
+class JsonlRange:
+    """
+    NDJSON 文件中一段字节范围的惰性视图（增量分析中本次新增的行），可以被多个分析依次遍历
+    """
+
+    def __init__(self, path, start, end):
+        self.path = Path(path)
+        self.start = start
+        self.end = end
+
+    def __iter__(self):
+        return iter_jsonl_range(self.path, self.start, self.end)
+
+    def __repr__(self):
+        return f"JsonlRange({str(self.path)!r}, {self.start}, {self.end})"
@@ -0,0 +1,27 @@
+"""
+图表并行渲染
+各张图互不依赖，统计结果在主进程算好后，每张图作为一个任务 (函数, 参数) 交给进程池渲染。
+子进程启动时把 matplotlib 切到无界面的 Agg 后端；matplotlib / wordcloud 由画图函数自己在函数内导入，
+主进程和不画图的进程都不加载。任务函数必须定义在模块顶层，才能传给子进程。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _init_worker():
+    os.environ["MPLBACKEND"] = "Agg"  # 先于 matplotlib 导入生效
+
+
+def render(jobs, workers=None):
+    """
+    渲染全部任务，按任务顺序返回各函数的返回值。workers 为 None 时取 CPU 核数与任务数中较小的一个，
+    为 1 或只有一个任务时在当前进程中依次执行
+    """
+    jobs = list(jobs)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        _init_worker()
+        return [fn(*args) for fn, args in jobs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(fn, *args) for fn, args in jobs]
+        return [future.result() for future in futures]
@@ -0,0 +1,192 @@
+"""
+歌词分词缓存
+每首歌的歌词清洗后用 jieba 分词一次，词序列（zlib 压缩）按清洗后文本的 sha1 存进 SQLite。
+词云、高频词等分析都从这里取词：歌词没变的歌直接读缓存，全部命中时不会加载 jieba 词典。
+缓存保存的是全部非空白词，停用词和长度过滤由各分析自己做，改停用词表不需要重新分词。
+jieba 版本或分词规则（TOKENIZER_VERSION）变化时整个缓存作废。
+分词可以分片交给进程池（make_pool）：每个子进程启动时加载一次 jieba 词典，
+有缓存时子进程返回各首歌的词列表写回缓存，不用缓存时直接返回分片的词频 Counter 在主进程合并。
+"""
+import hashlib
+import logging
+from importlib import metadata
+import os
+import re
+import sqlite3
+import zlib
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+TOKENIZER_VERSION = "1"  # 修改 clean_lyrics / tokenize 的规则后递增，使旧缓存失效
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    hash TEXT PRIMARY KEY,
+    tokens BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def clean_lyrics(song):  # 一首歌的歌词合并成一段文本，去掉作词/编曲信息和非中英文字符；没有歌词时返回 None
+    if 'lyrics' not in song or not song['lyrics']:
+        return None
+    lyrics_text = ' '.join(song['lyrics'])
+    lyrics_text = re.sub(r'作词.*?编曲.*?', '', lyrics_text)
+    return re.sub(r'[^\u4e00-\u9fa5a-zA-Z\s]', '', lyrics_text)
+
+
+def lyrics_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def tokenize(text):  # jieba 分词，去掉空白词；清洗后的文本中词内不会含空白
+    import jieba  # 延迟导入：分词缓存全部命中时不需要 jieba
+    return [w for w in jieba.cut(text) if not w.isspace()]
+
+
+def keep_word(word, stopwords):  # 词频统计只保留长度大于 1 且不在停用词表中的词
+    return len(word) > 1 and word.lower() not in stopwords
+
+
+def _init_worker():  # 子进程初始化：加载 jieba 词典，之后的分片不再付这部分开销
+    import jieba
+    jieba.setLogLevel(logging.WARNING)
+    jieba.initialize()
+
+
+def _tokenize_chunk(texts):  # 在子进程中执行
+    return [tokenize(text) for text in texts]
+
+
+def _count_chunk(texts, stopwords):  # 在子进程中执行：返回分片的词频，只回传 Counter 而不是全部词
+    counts = Counter()
+    for text in texts:
+        counts.update(w for w in tokenize(text) if keep_word(w, stopwords))
+    return counts
+
+
+def make_pool(workers=None):  # 分词进程池，workers 为 None 时取 CPU 核数
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_worker)
+
+
+class TokenCache:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        version = f"{TOKENIZER_VERSION}/jieba {metadata.version('jieba')}"
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != version:
+            with self._conn:
+                self._conn.execute("DELETE FROM tokens")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+        self.stats = {"hit": 0, "miss": 0}
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def get_many(self, keys):  # {hash: 词列表}，只包含缓存中已有的
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):  # SQLite 单条语句的参数个数有上限
+            batch = keys[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT hash, tokens FROM tokens WHERE hash IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, blob in rows:
+                text = zlib.decompress(blob).decode("utf-8")
+                found[key] = text.split(" ") if text else []
+        return found
+
+    def put_many(self, items):  # items: [(hash, 词列表)]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokens (hash, tokens) VALUES (?, ?)",
+                ((key, zlib.compress(" ".join(words).encode("utf-8"))) for key, words in items),
+            )
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _tokenize_many(texts, pool, chunk_size=50):  # 分片交给进程池时按小块分发，各进程负载更均匀
+    if pool is None or len(texts) < 2:
+        return [tokenize(text) for text in texts]
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    return [words for result in pool.map(_tokenize_chunk, chunks) for words in result]
+
+
+def iter_clean_texts(songs):  # 逐首产出清洗后的歌词；列式缓存（analysis/columnar.py）里已经清洗过，直接读取
+    if hasattr(songs, "iter_clean_texts"):
+        return songs.iter_clean_texts()
+    return (text for text in map(clean_lyrics, songs) if text is not None)
+
+
+def iter_song_tokens(songs, cache=None, batch_size=2000, pool=None):
+    """
+    按输入顺序逐首产出词列表（没有歌词的歌跳过）。每批歌曲先一次查询缓存，未命中的才分词并写回；
+    相同歌词只分词一次。cache 为 None 时每次都重新分词。
+    传入 pool（make_pool）时，每批需要分词的歌分块交给各子进程
+    """
+    for texts in _batches(iter_clean_texts(songs), batch_size):
+        if cache is None:
+            yield from _tokenize_many(texts, pool)
+            continue
+        keys = [lyrics_key(text) for text in texts]
+        found = cache.get_many(set(keys))
+        todo = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                todo.setdefault(key, text)
+        missing = dict(zip(todo, _tokenize_many(list(todo.values()), pool)))
+        if missing:
+            cache.put_many(missing.items())
+            found.update(missing)
+        cache.stats["hit"] += len(keys) - len(missing)
+        cache.stats["miss"] += len(missing)
+        for key in keys:
+            yield found[key]
+
+
+def count_words_parallel(songs, stopwords, pool, chunk_size=200, window=None):
+    """
+    不经过缓存，直接在子进程中分词并统计词频，按完成顺序合并各分片的 Counter。
+    同时在途的分片数有上限（默认 CPU 核数的两倍），内存占用不随语料增长
+    """
+    window = window or (os.cpu_count() or 1) * 2
+    stopwords = frozenset(stopwords)
+    total = Counter()
+    pending = set()
+    for chunk in _batches(iter_clean_texts(songs), chunk_size):
+        pending.add(pool.submit(_count_chunk, chunk, stopwords))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                total.update(future.result())
+    for future in pending:
+        total.update(future.result())
+    return total
@@ -0,0 +1,3 @@
+"""
+网易云音乐爬虫的异步抓取组件，spider.crawl() 的实际执行者
+"""
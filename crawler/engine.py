@@ -0,0 +1,358 @@
+"""
+异步爬虫引擎
+用 asyncio + aiohttp 替代 spider.crawl() 中逐个阻塞请求的写法：
+固定数量的 worker 从持久化任务队列（crawler/frontier.py）取歌手/歌曲/图片任务，
+每个域名有独立的并发上限和令牌桶限速；中断后重新运行从上次停下的地方继续。
+图片交给 crawler/images.py 在线程池中下载并按内容哈希存储。
+开启 spider.SAVE_HTML 后页面经 crawler/http_cache.py 缓存，replay() 可离线重放整个爬取。
+页面解析和记录组装复用 spider 中的函数（parse_*、build_*_record），与离线重新解析（crawler/reparse.py）一致。
+所有地址都由 base_url 拼出，测试时可以指向本地桩服务器。
+"""
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import spider
+from crawler.frontier import Frontier
+from crawler.http_cache import CACHEABLE_STATUS, CacheMiss, ResponseCache
+from crawler.images import ImageStore, safe_name
+from crawler.writer import NdjsonWriter
+
+class FetchError(Exception):
+    """重试用尽仍未取得页面（404 不算错误，返回 None）"""
+
+
+ARTIST_CAT_IDS = [1001, 1002, 1003, 2001, 2002, 2003, 6001, 6002, 6003]
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，最多攒 capacity 个令牌应对突发"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncCrawler:
+    def __init__(
+        self,
+        base_url: str = spider.SITE_URL,
+        out_dir: Path = spider.OUT_DIR,
+        concurrency: int = spider.CONCURRENCY,
+        per_host_limit: int = spider.PER_HOST_LIMIT,
+        rate: float = spider.RATE_LIMIT,
+        burst: float = spider.RATE_BURST,
+        max_artists: int = 100,
+        max_songs: int = 2000,
+        retries: int = 3,
+        retry_delay: float = 2.0,
+        timeout: float = 10.0,
+        frontier_path: Optional[Path] = None,
+        max_attempts: int = 3,
+        download_images: bool = True,
+        image_workers: int = 8,
+        cache: Optional[ResponseCache] = None,
+        checkpoint_every: int = 200,
+        checkpoint_interval: float = 5.0,
+        retry_failed: bool = True,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.out_dir = Path(out_dir)
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.rate = rate
+        self.burst = burst
+        self.max_artists = max_artists
+        self.max_songs = max_songs
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.frontier_path = Path(frontier_path) if frontier_path else self.out_dir / "frontier.sqlite3"
+        self.max_attempts = max_attempts
+        self.retry_failed = retry_failed  # 启动时把上次失败的任务重新排队
+        self.cache = cache if cache is not None else spider.get_http_cache()
+        # 离线回放不下载图片
+        self.download_images = download_images and not (self.cache is not None and self.cache.offline)
+        self.image_workers = image_workers
+        self.images: Optional[ImageStore] = None
+        self._image_pool: Optional[ThreadPoolExecutor] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.frontier: Optional[Frontier] = None
+        self._host_semaphores = {}
+        self._host_buckets = {}
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self._writers = {}
+        self._done = []  # 已处理完、等下次 checkpoint 再记为完成的任务
+        self._last_checkpoint = time.monotonic()
+        self.artist_cnt = 0
+        self.song_cnt = 0
+
+    # ---- HTTP ----
+
+    def _headers(self, with_cookies=True):
+        headers = {"User-Agent": spider.ua.random, "Referer": "https://music.163.com/"}
+        if with_cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in spider.COOKIES.items())
+        return headers
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str):  # 先取令牌再占用该域名的并发名额
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+            self._host_buckets[host] = TokenBucket(self.rate, self.burst)
+        await self._host_buckets[host].acquire()
+        async with self._host_semaphores[host]:
+            yield
+
+    async def fetch_bytes(self, url: str, with_cookies=True) -> Optional[bytes]:  # 404 返回 None，重试用尽抛出 FetchError
+        entry = None
+        if self.cache is not None:
+            try:
+                hit = self.cache.lookup(url)  # 离线模式或缓存仍新鲜时不访问网络
+            except CacheMiss:
+                raise FetchError(f"{url}: 离线模式下缓存中没有")
+            if hit is not None:
+                return hit.body if hit.status == 200 else None
+            entry = self.cache.get(url)
+        headers = {**self._headers(with_cookies), **ResponseCache.conditional_headers(entry)}
+        error = None
+        for _ in range(self.retries):
+            try:
+                async with self._host_slot(url):
+                    async with self.session.get(url, headers=headers) as resp:
+                        if resp.status == 304 and entry is not None:
+                            entry = self.cache.revalidated(url)
+                            return entry.body if entry.status == 200 else None
+                        if resp.status in CACHEABLE_STATUS:
+                            body = await resp.read() if resp.status == 200 else b""
+                            if self.cache is not None:
+                                self.cache.store(url, resp.status, body, resp.headers)
+                            return body if resp.status == 200 else None
+                        error = f"HTTP {resp.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+            await asyncio.sleep(self.retry_delay)
+        raise FetchError(f"{url}: {error}")
+
+    async def fetch(self, url: str, encoding="utf-8", with_cookies=True) -> Optional[str]:  # fetch_bytes 的文本版本，404 返回 None
+        body = await self.fetch_bytes(url, with_cookies)
+        return body.decode(encoding, errors="replace") if body is not None else None
+
+    # ---- 输出 ----
+
+    def save_as_json(self, content: dict, filename: str):  # 写入该文件的缓冲写入器，文件在整个爬取期间保持打开
+        writer = self._writers.get(filename)
+        if writer is None:
+            writer = self._writers[filename] = NdjsonWriter(self.out_dir / filename)
+        writer.write(content)
+
+    def _enqueue(self, children):  # children: {kind: [key 或 (key, payload)]}；在写出对应记录之前调用
+        for kind, items in children.items():
+            self.frontier.add(kind, items)
+
+    def _complete(self, task):
+        """
+        任务等输出落盘（checkpoint）后再记为完成：进程在两者之间被杀掉时，已写出记录的任务
+        在重启时由 sync_existing_output 按输出文件记为完成，其余任务重新执行，不会出现已完成但记录丢失的情况
+        """
+        self._done.append(task)
+        if (len(self._done) >= self.checkpoint_every
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval):
+            self.checkpoint()
+
+    def checkpoint(self):  # 写出并 fsync 全部输出，然后把期间处理完的任务一次性记为完成
+        for writer in self._writers.values():
+            writer.checkpoint()
+        if self._done:
+            self.frontier.complete_many(self._done)
+            self._done = []
+        self._last_checkpoint = time.monotonic()
+
+    # ---- 任务 ----
+
+    async def fetch_all_artist_ids(self) -> List[str]:  # 并发抓取所有歌手分类页，失败的分类跳过
+        pages = await asyncio.gather(*(
+            self.fetch(f"{self.base_url}/discover/artist/cat?id={cat_id}") for cat_id in ARTIST_CAT_IDS
+        ), return_exceptions=True)
+        ids = set()
+        for html in pages:
+            if isinstance(html, str):
+                ids.update(re.findall(r"/artist\?id=(\d+)", html))
+        return sorted(ids)
+
+    def _limit_reached(self):
+        return self.artist_cnt > self.max_artists and self.song_cnt > self.max_songs
+
+    def _image_task(self, url: str, *parts: str):  # 图片任务的 key 是网站读取时使用的相对路径
+        return "/".join(safe_name(p) for p in parts) + ".jpg", {"url": url}
+
+    async def handle_artist(self, task):
+        artist_id = task.key
+        html = await self.fetch(f"{self.base_url}/artist/desc?id={artist_id}")
+        if not html:
+            return self._complete(task)
+        info = spider.parse_artist_desc_page(html)
+        if not info or not info["name"] or not info["biography"] or not info["profile_img"]:
+            return self._complete(task)
+        html1 = await self.fetch(f"{self.base_url}/artist?id={artist_id}")  # 用于获取song_ids
+        song_ids = spider.fetch_songs_by_artist_id(html1)
+        artist = spider.build_artist_record(artist_id, info, song_ids)
+        if artist is None:
+            return self._complete(task)
+
+        # 歌曲和头像子任务先入队再写记录：记录出现在 artists.json 里时，子任务一定已经在队列中
+        self._enqueue({
+            "song": song_ids,
+            "image": [self._image_task(info["profile_img"], "artist_images", info["name"])],
+        })
+        self.save_as_json(artist, "artists.json")
+        self._complete(task)
+        self.artist_cnt += 1
+        print(f"已处理第{self.artist_cnt}位歌手: {info['name']}，待抓取歌曲数: {len(song_ids)}")
+        if self._limit_reached():
+            print(f"已处理 {self.artist_cnt} 位歌手，{self.song_cnt} 首歌曲，不再开始新的歌手")
+
+    async def handle_song(self, task):
+        sid = task.key
+        html = await self.fetch(f"{self.base_url}/song?id={sid}")
+        if not html:
+            return self._complete(task)
+        meta = spider.parse_song_page(html)
+        if not meta["name"] or not meta["artist_name"] or not meta["cover_img"]:
+            return self._complete(task)  # 页面信息不全时不必再请求歌词
+        # 歌词接口与原来一样不带登录 cookie，同样经过限速和响应缓存
+        lyric_json = await self.fetch(self.base_url + spider.LYRIC_PATH.format(song_id=sid), with_cookies=False)
+        song = spider.build_song_record(sid, meta, spider.parse_lyrics(lyric_json))
+        if song is None:
+            return self._complete(task)
+        print(f"正在处理歌曲: {song['name']} - {song['artist_name']}")
+        self._enqueue({
+            "image": [self._image_task(song["cover_img"], "song_images", song["artist_name"], song["name"])],
+        })
+        self.save_as_json(song, "songs.json")
+        self._complete(task)
+        self.song_cnt += 1
+
+    async def handle_image(self, task):  # 图片在线程池中流式下载，不占用事件循环
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._image_pool, self.images.download, task.payload["url"], task.key)
+        self._complete(task)
+
+    async def worker(self):
+        handlers = {"artist": self.handle_artist, "song": self.handle_song, "image": self.handle_image}
+        while True:
+            # 达到数量上限后只把已开始的歌手的歌曲和图片做完，剩余歌手留在队列里下次继续
+            task = self.frontier.claim(self._claimable_kinds())
+            if task is None:
+                if self._in_flight == 0:
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+            self._in_flight += 1
+            try:
+                await handlers[task.kind](task)
+            except Exception as e:
+                state = self.frontier.fail(task, e)
+                print(f"任务失败 {task.kind} {task.key}（第{task.attempts}次，{state}）: {e}")
+            finally:
+                self._in_flight -= 1
+                self._changed.set()
+
+    def _claimable_kinds(self):
+        kinds = ["song"]
+        if not self._limit_reached():
+            kinds.append("artist")
+        if self.download_images:  # 不下载图片时图片任务留在队列里，由 python -m crawler.images 单独处理
+            kinds.append("image")
+        return kinds
+
+    def sync_existing_output(self):
+        """
+        已写入输出文件的记录直接记为完成（按 source_url 去重）：上次写出记录后、checkpoint 之前被杀掉的任务
+        不会重新抓取而重复写入；也兼容没有队列文件的旧输出。子任务总在写记录之前入队，覆盖队列中的状态是安全的
+        """
+        artist_ids = _ids_from_source_urls(spider.load_existing_source_urls("artists.json", self.out_dir))
+        song_ids = _ids_from_source_urls(spider.load_existing_source_urls("songs.json", self.out_dir))
+        self.frontier.mark_done("artist", artist_ids)
+        self.frontier.mark_done("song", song_ids)
+
+    async def run(self):
+        self.frontier = Frontier(self.frontier_path, max_attempts=self.max_attempts)
+        recovered = self.frontier.recover()
+        if recovered:
+            print(f"恢复上次中断的任务 {recovered} 个")
+        if self.retry_failed:
+            retried = self.frontier.retry_failed()
+            if retried:
+                print(f"重新排队上次失败的任务 {retried} 个")
+        self.sync_existing_output()
+        self._in_flight = 0
+        self._changed = asyncio.Event()
+        if self.download_images:
+            self.images = ImageStore(self.out_dir, workers=self.image_workers)
+            self._image_pool = ThreadPoolExecutor(max_workers=self.image_workers)
+        connector = aiohttp.TCPConnector(limit=self.concurrency * 2)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=self.timeout) as session:
+                self.session = session
+                self.frontier.add("artist", await self.fetch_all_artist_ids())
+                await asyncio.gather(*(self.worker() for _ in range(self.concurrency)))
+            self.checkpoint()
+            print(f"爬取结束：本次 {self.artist_cnt} 位歌手，{self.song_cnt} 首歌曲；队列状态 {self.frontier.counts()}")
+            if self.images is not None:
+                print(f"图片: {self.images.stats}")
+            if self.cache is not None:
+                print(f"响应缓存: {self.cache.stats}")
+        finally:
+            self.checkpoint()
+            for writer in self._writers.values():
+                writer.close()
+            if self.images is not None:
+                self._image_pool.shutdown()
+                self.images.close()
+            self.frontier.close()
+        return self.artist_cnt, self.song_cnt
+
+
+def _ids_from_source_urls(source_urls):
+    return [m.group(1) for m in (re.search(r"id=(\d+)", url) for url in source_urls) if m]
+
+
+def run_crawl(**kwargs):
+    return asyncio.run(AsyncCrawler(**kwargs).run())
+
+
+def replay(out_dir, cache_dir=spider.HTML_DIR, **kwargs):
+    """
+    离线回放：只用缓存的响应把整个爬取流程重跑一遍，结果写到 out_dir（应是新目录，
+    它有自己的任务队列）。修改解析规则后用它在几秒内重新生成全部输出，不访问网络。
+    """
+    cache = ResponseCache(cache_dir, offline=True)
+    try:
+        return run_crawl(out_dir=out_dir, cache=cache, **kwargs)
+    finally:
+        cache.close()
@@ -0,0 +1,143 @@
+"""
+可断点续爬的任务队列（frontier）
+歌手/歌曲/图片抓取任务存放在 SQLite 表里，每个任务由 (kind, key) 唯一确定，
+状态为 pending / running / done / failed。任务完成与其派生的子任务在同一事务中写入，
+进程中途退出后重启：running 的任务回到 pending，已完成的歌曲不会再次抓取；
+上次重试用尽记为 failed 的任务默认也重新排队，再给 max_attempts 次机会。
+"""
+import json
+import sqlite3
+import time
+from collections import namedtuple
+from pathlib import Path
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# 数字越大越先执行：先把已开始的歌手的歌曲和图片做完，再开始新歌手
+PRIORITY = {"artist": 0, "song": 1, "image": 2}
+
+Task = namedtuple("Task", "kind key payload attempts")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    state TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (state, priority DESC, id);
+"""
+
+
+class Frontier:
+    def __init__(self, path, max_attempts=3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def recover(self):  # 上次异常退出时仍在 running 的任务重新排队，返回数量
+        with self.conn:
+            cur = self.conn.execute(
+                "UPDATE tasks SET state = ?, updated_at = ? WHERE state = ?", (PENDING, time.time(), RUNNING)
+            )
+        return cur.rowcount
+
+    def _rows(self, kind, items, state):
+        now = time.time()
+        priority = PRIORITY.get(kind, 0)
+        for item in items:
+            key, payload = item if isinstance(item, tuple) else (item, None)
+            yield kind, str(key), json.dumps(payload or {}, ensure_ascii=False), state, priority, now
+
+    def add(self, kind, items):  # items: key 或 (key, payload)；已存在的任务不受影响
+        with self.conn:
+            self._insert(kind, items)
+
+    def _insert(self, kind, items):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tasks (kind, key, payload, state, priority, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            self._rows(kind, items, PENDING),
+        )
+
+    def mark_done(self, kind, keys):  # 把已有输出中出现过的任务记为完成，队列中已有的任务同样改为完成
+        sql = (
+            "INSERT INTO tasks (kind, key, payload, state, priority, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at"
+        )
+        with self.conn:
+            self.conn.executemany(sql, self._rows(kind, keys, DONE))
+
+    def claim(self, kinds=None):  # 取出优先级最高的一个 pending 任务并标记为 running，没有返回 None
+        sql = "SELECT id, kind, key, payload, attempts FROM tasks WHERE state = ?"
+        params = [PENDING]
+        if kinds is not None:
+            sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        sql += " ORDER BY priority DESC, id LIMIT 1"
+        with self.conn:
+            row = self.conn.execute(sql, params).fetchone()
+            if row is None:
+                return None
+            task_id, kind, key, payload, attempts = row
+            self.conn.execute(
+                "UPDATE tasks SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, time.time(), task_id),
+            )
+        return Task(kind, key, json.loads(payload), attempts + 1)
+
+    def complete(self, task, children=None):  # children: {kind: [key 或 (key, payload)]}，与完成标记同一事务写入
+        with self.conn:
+            for kind, items in (children or {}).items():
+                self._insert(kind, items)
+            self.conn.execute(
+                "UPDATE tasks SET state = ?, error = '', updated_at = ? WHERE kind = ? AND key = ?",
+                (DONE, time.time(), task.kind, task.key),
+            )
+
+    def complete_many(self, tasks):  # 批量记为完成，一个事务
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tasks SET state = ?, error = '', updated_at = ? WHERE kind = ? AND key = ?",
+                [(DONE, now, task.kind, task.key) for task in tasks],
+            )
+
+    def fail(self, task, error):  # 未超过重试次数的任务回到 pending，否则记为 failed
+        state = FAILED if task.attempts >= self.max_attempts else PENDING
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET state = ?, error = ?, updated_at = ? WHERE kind = ? AND key = ?",
+                (state, str(error)[:500], time.time(), task.kind, task.key),
+            )
+        return state
+
+    def retry_failed(self, kind=None):  # 把 failed 任务重新排队，返回数量
+        sql = "UPDATE tasks SET state = ?, attempts = 0, updated_at = ? WHERE state = ?"
+        params = [PENDING, time.time(), FAILED]
+        if kind is not None:
+            sql += " AND kind = ?"
+            params.append(kind)
+        with self.conn:
+            return self.conn.execute(sql, params).rowcount
+
+    def counts(self):  # {kind: {state: 数量}}
+        result = {}
+        for kind, state, n in self.conn.execute("SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state"):
+            result.setdefault(kind, {})[state] = n
+        return result
@@ -0,0 +1,108 @@
+"""
+页面/接口响应缓存
+按 URL 把响应体（zlib 压缩）和 ETag / Last-Modified 存进 SQLite。
+再次请求同一 URL 时带上 If-None-Match / If-Modified-Since，服务器返回 304 就直接用缓存；
+离线模式只读缓存、完全不访问网络，改了解析规则后可以用缓存把整个语料重新跑一遍。
+404 也会缓存，回放时与在线抓取的跳过行为一致。
+"""
+import sqlite3
+import time
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+CacheEntry = namedtuple("CacheEntry", "url status body etag last_modified fetched_at validated_at")
+
+CACHEABLE_STATUS = (200, 404)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT '',
+    fetched_at REAL NOT NULL,
+    validated_at REAL NOT NULL
+);
+"""
+
+
+class CacheMiss(Exception):
+    """离线模式下缓存中没有该 URL"""
+
+
+class ResponseCache:
+    def __init__(self, root, offline=False, max_age=0):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.offline = offline
+        self.max_age = max_age  # 验证后多少秒内直接使用，不发请求
+        self._conn = sqlite3.connect(str(self.root / "responses.sqlite3"))  # 只在事件循环所在线程中使用
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.stats = {"hit": 0, "revalidated": 0, "stored": 0, "miss": 0}
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, url):
+        row = self._conn.execute(
+            "SELECT url, status, body, etag, last_modified, fetched_at, validated_at FROM responses WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(row[0], row[1], zlib.decompress(row[2]), *row[3:])
+
+    def is_fresh(self, entry):
+        return self.max_age > 0 and time.time() - entry.validated_at < self.max_age
+
+    def lookup(self, url):  # 不需要访问网络时返回缓存条目；离线模式下没有缓存抛出 CacheMiss
+        entry = self.get(url)
+        if self.offline:
+            if entry is None:
+                self.stats["miss"] += 1
+                raise CacheMiss(url)
+            self.stats["hit"] += 1
+            return entry
+        if entry is not None and self.is_fresh(entry):
+            self.stats["hit"] += 1
+            return entry
+        return None
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url, status, body, headers):
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, status, body, etag, last_modified, fetched_at, validated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, status, zlib.compress(body), headers.get("ETag", ""), headers.get("Last-Modified", ""), now, now),
+            )
+            self.stats["stored"] += 1
+
+    def revalidated(self, url):  # 服务器返回 304：更新验证时间，返回缓存条目
+        with self._conn:
+            self._conn.execute("UPDATE responses SET validated_at = ? WHERE url = ?", (time.time(), url))
+            self.stats["revalidated"] += 1
+        return self.get(url)
+
+    def urls(self, prefix="", order="url"):  # 按前缀列出已缓存的 URL，如 "https://music.163.com/song?id="；order="fetched_at" 按抓取顺序
+        order_by = {"url": "url", "fetched_at": "fetched_at, url"}[order]
+        rows = self._conn.execute(
+            f"SELECT url FROM responses WHERE url >= ? AND url < ? ORDER BY {order_by}", (prefix, prefix + "\uffff")
+        ).fetchall()
+        return [r[0] for r in rows]
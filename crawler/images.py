@@ -0,0 +1,205 @@
+"""
+图片下载阶段：按内容哈希存储
+图片由线程池并发下载，边下载边分块写入临时文件并计算 sha256，完成后放到
+images/<前两位>/<sha256>.jpg；内容相同的图片（多首歌共用的封面）只存一份。
+清单（SQLite）记录 URL -> 哈希 和 文件名 -> 哈希，已下载过的 URL 不再请求。
+网站仍按 artist_images/<歌手>.jpg、song_images/<歌手>/<歌名>.jpg 读取图片，
+这些文件名以硬链接（不支持时复制）指向内容文件。
+
+单独运行时处理任务队列里所有待下载的图片：python -m crawler.images
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+import spider
+from crawler.frontier import Frontier
+
+CHUNK_SIZE = 64 * 1024
+BLOB_DIR = "images"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+"""
+
+
+def safe_name(name: str) -> str:  # 歌手名/歌名中的路径分隔符会被当成子目录，替换为下划线
+    return name.replace("/", "_").replace("\\", "_").strip()
+
+
+class ImageStore:
+    def __init__(self, root, workers=8, chunk_size=CHUNK_SIZE, timeout=10):
+        self.root = Path(root)
+        self.blob_root = self.root / BLOB_DIR
+        self.blob_root.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._conn = sqlite3.connect(str(self.blob_root / "manifest.sqlite3"), check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._url_locks = {}
+        self.stats = {"downloaded": 0, "cached": 0, "deduped": 0, "missing": 0}
+
+    def close(self):
+        self._conn.close()
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blob_root / sha256[:2] / f"{sha256}.jpg"
+
+    def lookup(self, url: str):  # 已下载过的 URL 返回 sha256，否则 None
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM urls WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def _session(self):  # requests.Session 不保证线程安全，每个线程一个
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _url_lock(self, url):  # 同一 URL 同时只下载一次
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def _bump(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _fetch_to_blob(self, url: str):  # 流式下载到临时文件并计算哈希，返回 (sha256, size)；404 返回 None
+        headers = {"User-Agent": spider.ua.random}
+        with self._session().get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            if resp.status_code == 404:
+                return None
+            resp.raise_for_status()
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp = tempfile.mkstemp(dir=self.blob_root, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in resp.iter_content(self.chunk_size):
+                        digest.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+                sha256 = digest.hexdigest()
+                blob = self.blob_path(sha256)
+                if blob.exists():
+                    os.unlink(tmp)  # 内容已存在，只登记 URL
+                    self._bump("deduped")
+                else:
+                    blob.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp, blob)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        return sha256, size
+
+    def _link(self, sha256: str, name: str):  # 让 name（相对 root 的路径）指向内容文件
+        blob = self.blob_path(sha256)
+        dest = self.root / name
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if dest.exists() and os.path.samefile(dest, blob):
+                return
+        except OSError:
+            pass
+        tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+
+    def download(self, url: str, name: str):
+        """
+        下载 url 并登记为 name（如 "artist_images/歌手.jpg"），返回 sha256；图片不存在返回 None
+        """
+        with self._url_lock(url):
+            sha256 = self.lookup(url)
+            if sha256 is not None and self.blob_path(sha256).exists():
+                self._bump("cached")
+            else:
+                result = self._fetch_to_blob(url)
+                if result is None:
+                    self._bump("missing")
+                    return None
+                sha256, size = result
+                self._bump("downloaded")
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO urls (url, sha256, size, fetched_at) VALUES (?, ?, ?, ?)",
+                        (url, sha256, size, time.time()),
+                    )
+        self._link(sha256, name)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO names (name, sha256, url) VALUES (?, ?, ?)", (name, sha256, url)
+            )
+        return sha256
+
+    def download_many(self, items):  # items: [(url, name)]，线程池并发下载；返回与 items 对应的结果或异常
+        def run(item):
+            try:
+                return self.download(*item)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run, items))
+
+
+def drain_frontier(out_dir=spider.OUT_DIR, frontier_path=None, workers=8, batch_size=200):
+    """
+    下载任务队列中所有待处理的图片任务（爬取时可以关闭图片下载，之后单独运行这一步）
+    """
+    out_dir = Path(out_dir)
+    frontier = Frontier(frontier_path or out_dir / "frontier.sqlite3")
+    store = ImageStore(out_dir, workers=workers)
+    failed = 0
+    try:
+        frontier.recover()
+        while True:
+            tasks = []
+            while len(tasks) < batch_size:
+                task = frontier.claim(("image",))
+                if task is None:
+                    break
+                tasks.append(task)
+            if not tasks:
+                break
+            results = store.download_many([(t.payload["url"], t.key) for t in tasks])
+            for task, result in zip(tasks, results):
+                if isinstance(result, Exception):
+                    frontier.fail(task, result)
+                    failed += 1
+                else:
+                    frontier.complete(task)
+            print(f"图片: {store.stats}，失败 {failed}")
+    finally:
+        store.close()
+        frontier.close()
+    return store.stats, failed
+
+
+if __name__ == "__main__":
+    drain_frontier()
@@ -0,0 +1,169 @@
+"""
+页面解析后端
+spider.parse_artist_desc_page / parse_song_page 只需要几个 <meta>、第一个 <img> 和简介 div，
+不必为此构建完整的 BeautifulSoup 树。这里提供两个后端：
+  bs4   原来的 BeautifulSoup(html.parser) 实现，作为对照
+  regex 用一个正则按文档顺序扫描标签，只解析关心的标签属性，找齐字段后立即停止
+两者输出应完全一致，见 misc/check_parsers.py（golden 文件校验和基准测试）。
+"""
+import re
+from html import unescape
+
+# 与 html.parser 的切分方式一致：注释、script/style 原始文本、CDATA、起止标签；
+# 属性值里的引号内容整体匹配，避免把属性里的 "<img" 当成标签
+_TOKEN_RE = re.compile(
+    r"<!--.*?(?:-->|\Z)"
+    r"|<!\[CDATA\[(?P<cdata>.*?)\]\]>"
+    r"|<(?P<raw>script|style)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>.*?(?:</(?P=raw)\s*>|\Z)"
+    r"|<(?P<close>/?)(?P<name>[a-zA-Z][^\s/>]*)(?P<attrs>(?:[^>\"']|\"[^\"]*\"|'[^']*')*)>",
+    re.S | re.I,
+)
+_ATTR_RE = re.compile(
+    r"(?<=['\"\s/])([^\s/>][^\s/=>]*)(\s*=+\s*('[^']*'|\"[^\"]*\"|(?!['\"])[^>\s]*))?(?:\s|/(?!>))*"
+)
+
+
+def _parse_attrs(text):  # 属性名小写、值反转义；没有值的属性为 ""，重复的属性以最后一个为准（与 bs4 一致）
+    attrs = {}
+    for m in _ATTR_RE.finditer(text):
+        name, rest, value = m.group(1, 2, 3)
+        if not rest:
+            value = ""
+        elif value[:1] == value[-1:] and value[:1] in ("'", '"'):
+            value = value[1:-1]
+        attrs[name.lower()] = unescape(value) if value else ""
+    return attrs
+
+
+def _has_class(attrs, cls):
+    value = attrs.get("class") or ""
+    return value == cls or cls in value.split()
+
+
+class _RegexScan:
+    def __init__(self, html):
+        self.html = html
+        self.pos = 0
+
+    def tokens(self):
+        for m in _TOKEN_RE.finditer(self.html, self.pos):
+            self.pos = m.end()
+            yield m
+
+    def text_of_element(self, name, start):  # 相当于 tag.get_text(strip=True)：start 为起始标签之后的位置
+        parts = []
+        depth = 1
+        last = start
+        for m in _TOKEN_RE.finditer(self.html, start):
+            parts.append(self.html[last:m.start()])
+            last = m.end()
+            if m.group("cdata") is not None:
+                parts.append(m.group("cdata"))
+                continue
+            tag = m.group("name")
+            if tag is None or tag.lower() != name:
+                continue
+            if m.group("close"):
+                depth -= 1
+                if depth == 0:
+                    break
+            elif not m.group("attrs").rstrip().endswith("/"):
+                depth += 1
+        else:
+            parts.append(self.html[last:])
+        texts = (unescape(p).strip() for p in parts)
+        return "".join(t for t in texts if t)
+
+
+def _regex_artist_desc(html):
+    name = bio = profile_img = None
+    scan = _RegexScan(html)
+    for m in scan.tokens():
+        tag = m.group("name")
+        if tag is None or m.group("close"):
+            continue
+        tag = tag.lower()
+        if tag == "meta" and name is None:
+            attrs = _parse_attrs(m.group("attrs"))
+            if attrs.get("name") == "keywords":
+                name = (attrs.get("content") or "").strip()
+        elif tag == "img" and profile_img is None:
+            src = _parse_attrs(m.group("attrs")).get("src") or ""
+            profile_img = src.strip() if src.startswith("http") else ""
+        elif tag == "div" and bio is None:
+            if _has_class(_parse_attrs(m.group("attrs")), "n-artdesc"):
+                bio = scan.text_of_element("div", m.end())
+        if name is not None and bio is not None and profile_img is not None:
+            break
+    return {
+        "name": name or "",
+        "biography": bio or "",
+        "profile_img": profile_img or "",
+    }
+
+
+_SONG_META = {"og:title": "name", "og:music:artist": "artist_name", "og:image": "cover_img"}
+
+
+def _regex_song_meta(html):
+    found = {}
+    for m in _RegexScan(html).tokens():
+        tag = m.group("name")
+        if tag is None or m.group("close") or tag.lower() != "meta":
+            continue
+        attrs = _parse_attrs(m.group("attrs"))
+        field = _SONG_META.get(attrs.get("property"))
+        if field is not None and field not in found:
+            found[field] = attrs["content"].strip()
+            if len(found) == len(_SONG_META):
+                break
+    return {field: found.get(field, "") for field in _SONG_META.values()}
+
+
+def _bs4_artist_desc(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    name_tag = soup.find("meta", attrs={"name": "keywords"})
+    desc_div = soup.find("div", class_="n-artdesc")
+    img_tag = soup.find("img")
+
+    name = name_tag.get("content", "").strip() if name_tag else ""
+    bio = desc_div.get_text(strip=True) if desc_div else ""
+    profile_img = img_tag.get("src", "").strip() if img_tag and img_tag.get("src", "").startswith("http") else ""
+
+    return {
+        "name": name,
+        "biography": bio,
+        "profile_img": profile_img
+    }
+
+
+def _bs4_song_meta(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    name_tag = soup.find("meta", property="og:title")
+    artist_tag = soup.find("meta", property="og:music:artist")
+    image_tag = soup.find("meta", property="og:image")
+
+    return {
+        "name": name_tag["content"].strip() if name_tag else "",
+        "artist_name": artist_tag["content"].strip() if artist_tag else "",
+        "cover_img": image_tag["content"].strip() if image_tag else "",
+    }
+
+
+BACKENDS = {
+    "bs4": (_bs4_artist_desc, _bs4_song_meta),
+    "regex": (_regex_artist_desc, _regex_song_meta),
+}
+
+
+def get_backend(name):  # 返回 (解析歌手简介页, 解析歌曲页 meta) 两个函数
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"未知的解析后端: {name}，可选 {', '.join(BACKENDS)}")
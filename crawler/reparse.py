@@ -0,0 +1,137 @@
+"""
+离线批量重新解析
+修改解析规则后，用响应缓存（crawler/http_cache.py）中保存的页面和歌词接口响应重新生成
+songs.json / artists.json，不访问网络。页面按块分发到 ProcessPoolExecutor 并行解析，
+主进程按抓取顺序依次写出结果：同时在途的块数有上限，内存占用不随语料增长。
+输出先写临时文件，全部完成后替换目标文件。
+
+用法: python -m crawler.reparse [--kind song|artist] [--workers N] [--chunk-size 200] [--output PATH]
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import spider
+from crawler.http_cache import ResponseCache
+from crawler.parsers import get_backend
+from crawler.writer import NdjsonWriter
+
+
+def _parse_song_chunk(backend, items):  # 在子进程中执行：items 为 [(song_id, 页面, 歌词 JSON)]
+    _, parse_song_meta = get_backend(backend)
+    return [
+        spider.build_song_record(sid, parse_song_meta(html), spider.parse_lyrics(lyric_json))
+        for sid, html, lyric_json in items
+    ]
+
+
+def _parse_artist_chunk(backend, items):  # 在子进程中执行：items 为 [(artist_id, 简介页, 歌手主页)]
+    parse_artist, _ = get_backend(backend)
+    return [
+        spider.build_artist_record(aid, parse_artist(desc_html), spider.fetch_songs_by_artist_id(artist_html))
+        for aid, desc_html, artist_html in items
+    ]
+
+
+def _body(cache, url):  # 缓存中状态为 200 的响应文本，否则 None
+    entry = cache.get(url)
+    if entry is None or entry.status != 200:
+        return None
+    return entry.body.decode("utf-8", errors="replace")
+
+
+def iter_song_pages(cache, base_url=spider.SITE_URL):  # 按抓取顺序产出 (song_id, 页面, 歌词 JSON)
+    prefix = f"{base_url}/song?id="
+    for url in cache.urls(prefix, order="fetched_at"):
+        sid = url[len(prefix):]
+        html = _body(cache, url)
+        if html is not None:
+            yield sid, html, _body(cache, base_url + spider.LYRIC_PATH.format(song_id=sid))
+
+
+def iter_artist_pages(cache, base_url=spider.SITE_URL):  # 按抓取顺序产出 (artist_id, 简介页, 歌手主页)
+    prefix = f"{base_url}/artist/desc?id="
+    for url in cache.urls(prefix, order="fetched_at"):
+        aid = url[len(prefix):]
+        html = _body(cache, url)
+        if html is not None:
+            yield aid, html, _body(cache, f"{base_url}/artist?id={aid}")
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ordered_map(pool, fn, args_iter, window):
+    """
+    类似 pool.map，但只提前提交 window 个任务，结果按提交顺序逐个产出
+    （Executor.map 会一次性提交全部任务，所有页面都会读进内存）
+    """
+    pending = deque()
+    for args in args_iter:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+KINDS = {
+    "song": (iter_song_pages, _parse_song_chunk, "songs.json"),
+    "artist": (iter_artist_pages, _parse_artist_chunk, "artists.json"),
+}
+
+
+def reparse(kind="song", output=None, cache_dir=spider.HTML_DIR, workers=None, chunk_size=200,
+            backend=spider.PARSER_BACKEND, base_url=spider.SITE_URL):
+    """
+    重新解析缓存中的全部页面并写出 NDJSON，返回 (解析页面数, 写出记录数)
+    """
+    iter_pages, parse_chunk, filename = KINDS[kind]
+    output = Path(output) if output else spider.OUT_DIR / filename
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+    workers = workers or os.cpu_count() or 1
+    cache = ResponseCache(cache_dir, offline=True)
+    parsed = written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool, NdjsonWriter(tmp, mode="w") as writer:
+            args = ((backend, chunk) for chunk in _chunks(iter_pages(cache, base_url.rstrip("/")), chunk_size))
+            for records in ordered_map(pool, parse_chunk, args, window=workers * 2):
+                parsed += len(records)
+                for record in records:
+                    if record is not None:
+                        writer.write(record)
+                        written += 1
+        os.replace(tmp, output)
+    finally:
+        cache.close()
+        if tmp.exists():
+            tmp.unlink()
+    return parsed, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用响应缓存离线重新解析歌手/歌曲页面")
+    parser.add_argument("--kind", choices=sorted(KINDS), default="song")
+    parser.add_argument("--output", help="输出文件，默认 output/songs.json 或 output/artists.json")
+    parser.add_argument("--cache-dir", default=str(spider.HTML_DIR))
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为 CPU 核数")
+    parser.add_argument("--chunk-size", type=int, default=200, help="每个子任务包含的页面数")
+    parser.add_argument("--backend", default=spider.PARSER_BACKEND, help="解析后端，见 crawler/parsers.py")
+    args = parser.parse_args()
+    parsed, written = reparse(args.kind, args.output, args.cache_dir, args.workers, args.chunk_size, args.backend)
+    print(f"重新解析 {parsed} 个页面，写出 {written} 条记录")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+带缓冲的 NDJSON 写入器
+文件在整个爬取期间保持打开，记录先编码进内存缓冲，条数/字节数/时间超过阈值时一次写出；
+checkpoint() 在写出后 fsync，爬虫在这之后才把对应任务记为完成。
+打开已有文件时截掉上次进程中断留下的半行；compact() 通过临时文件 + rename 去重重写。
+
+用法: python -m crawler.writer compact output/songs.json [--key source_url]
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+
+def repair(path):  # 文件末尾不是换行说明上次写到一半，截到最后一个完整行，返回截掉的字节数
+    path = Path(path)
+    if not path.exists():
+        return 0
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # 从后往前按块找最后一个换行
+        pos = size
+        while pos > 0:
+            step = min(64 * 1024, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            idx = block.rfind(b"\n")
+            if idx != -1:
+                end = pos + idx + 1
+                break
+        else:
+            end = 0
+        f.truncate(end)
+        return size - end
+
+
+class NdjsonWriter:
+    def __init__(self, path, max_records=1000, max_bytes=1 << 20, max_delay=5.0, mode="a"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        if mode == "a":
+            repair(self.path)
+        self._file = open(self.path, mode + "b")
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        self.written = 0
+
+    def write(self, record):  # 返回本次是否触发了写出
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+        if (len(self._buffer) >= self.max_records or self._buffered_bytes >= self.max_bytes
+                or time.monotonic() - self._last_flush >= self.max_delay):
+            self.flush()
+            return True
+        return False
+
+    def flush(self):  # 缓冲一次写出（单次 write 调用），交给操作系统但不 fsync
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self.written += len(self._buffer)
+            self._buffer.clear()
+            self._buffered_bytes = 0
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def checkpoint(self):  # 写出并落盘；之后可以安全地把这些记录对应的任务记为完成
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.checkpoint()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compact(path, key=None):
+    """
+    重写 NDJSON 文件：丢弃无法解析的行，指定 key 时按该字段去重（保留第一次出现的记录）。
+    先写同目录的临时文件并 fsync，再 rename 覆盖原文件，中途出错原文件不受影响。
+    返回 (保留行数, 丢弃行数)
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".compact.tmp")
+    seen = set()
+    kept = dropped = 0
+    try:
+        with open(path, "r", encoding="utf-8") as src, NdjsonWriter(tmp, mode="w") as dst:
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    dropped += 1
+                    continue
+                if key is not None:
+                    value = record.get(key) if isinstance(record, dict) else None
+                    if value is not None and value in seen:
+                        dropped += 1
+                        continue
+                    seen.add(value)
+                dst.write(record)
+                kept += 1
+        os.replace(tmp, path)
+        if hasattr(os, "O_DIRECTORY"):  # rename 本身也要落盘
+            fd = os.open(path.parent, os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return kept, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NDJSON 输出文件维护")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("compact", help="去掉损坏的行并按字段去重")
+    p.add_argument("path")
+    p.add_argument("--key", default="source_url", help="去重字段，传空字符串表示不去重")
+    args = parser.parse_args()
+    kept, dropped = compact(args.path, args.key or None)
+    print(f"{args.path}: 保留 {kept} 行，丢弃 {dropped} 行")
+
+
+if __name__ == "__main__":
+    main()
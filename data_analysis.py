@@ -3,19 +3,22 @@
 """
 网易云音乐数据分析脚本
 基础分析、词云、歌词中英文每句长度分布统计
+统计在主进程完成，各张图表交给进程池并行渲染（见 analysis/runner.py）
+
+用法: python data_analysis.py [wordcloud top_words line_length awards] [--incremental] [--workers N]
 """
 
-import json
-import matplotlib.pyplot as plt
-import numpy as np
-import re
-import jieba
-from wordcloud import WordCloud
+import argparse
+import statistics
+from collections import Counter
 import warnings
-warnings.filterwarnings('ignore')
+from pathlib import Path
 
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'PingFang HK']
-plt.rcParams['axes.unicode_minus'] = False
+from analysis.keywords import KeywordMatcher, iter_counts
+from analysis.loader import JsonlFile
+from analysis.runner import render
+from analysis.tokens import TOKENIZER_VERSION, TokenCache, count_words_parallel, iter_song_tokens, keep_word, make_pool
+warnings.filterwarnings('ignore')
 
 # 中英文停用词，含常见英文缩写和口语词
 STOPWORDS = set([
@@ -38,165 +41,101 @@ STOPWORDS = set([
     "oh", "la", "yeah", "something", "anything", "everything", "nothing", "someone", "anyone", "everyone", "noone", "somebody", "anybody", "everybody", "nobody", "somewhere", "anywhere", "everywhere", "nowhere", "somehow", "anyhow", "somewhat", "anyway", "anyways", "someway", "someways", "somewhen", "anywhen", "somewhy", "anywhy", "somewhat", "anywhat", "somewho", "anywho", "somewhere", "anywhere", "everywhere", "nowhere", "somehow", "anyhow", "someway", "anyway", "someways", "anyways", "somewhen", "anywhen", "somewhy", "anywhy", "somewhat", "anywhat", "somewho", "anywho"
 ])
 
-def load_data():
+# 获奖相关词汇（中英文合并）
+AWARD_KEYWORDS = [
+    # 中文获奖词汇
+    '奖', '获奖', '得奖', '提名', '冠军', '亚军', '季军', '金牌', '银牌', '铜牌', 
+    '最佳', '优秀', '杰出', '卓越', '突出', '贡献', '成就', '荣誉', '称号',
+    '格莱美', '奥斯卡', '金曲奖', '金马奖', '金像奖', '金钟奖', '金鹰奖', '百花奖',
+    '华表奖', '飞天奖', '白玉兰', '金鸡奖', '金棕榈', '金熊奖', '金狮奖', '金球奖',
+    # 英文获奖词汇
+    'award', 'awards', 'winner', 'winning', 'won', 'nomination', 'nominated', 
+    'champion', 'championship', 'gold', 'silver', 'bronze', 'medal', 'medals',
+    'best', 'excellent', 'outstanding', 'distinguished', 'achievement', 'achievements',
+    'honor', 'honors', 'honour', 'honours', 'recognition',
+    'grammy', 'oscar', 'emmy', 'tony', 'pulitzer', 'nobel', 'academy', 'academies'
+]
+
+# 平均句长直方图的分箱：np.arange 的 (起点, 终点, 步长)
+ZH_BINS = (4, 17, 0.5)
+EN_BINS = (2, 15, 0.5)
+
+ARTISTS_PATH = 'output/artists.json'
+SONGS_PATH = 'output/songs.json'
+USE_COLUMNAR_CACHE = True  # 把原始数据编译成内存映射的列式缓存，源文件没变时直接复用
+COLUMNAR_CACHE_DIR = 'output/analysis_cache/columnar'
+USE_TOKEN_CACHE = True  # 每首歌的分词结果按歌词哈希缓存，重跑时只对新歌或改过歌词的歌分词
+TOKEN_CACHE_PATH = 'output/analysis_cache/tokens.sqlite3'
+JIEBA_WORKERS = None    # 分词进程数：None 为 CPU 核数，1 为在主进程中分词
+AWARD_WORKERS = 1       # 获奖词汇匹配的进程数：None 为 CPU 核数；简介不多时单进程更快
+INCREMENTAL_STATE_PATH = 'output/analysis_cache/incremental.json'  # --incremental 模式保存的中间结果
+
+def bin_edges(bins):  # 由 (起点, 终点, 步长) 生成直方图的分箱边界
+    import numpy as np
+    return np.arange(*bins)
+
+def load_data(columnar=USE_COLUMNAR_CACHE):
+    """
+    开启列式缓存时返回内存映射的歌手/歌曲数据（见 analysis/columnar.py，源文件变化时自动重新编译），
+    否则返回两个惰性视图，每次遍历都流式读取 NDJSON 文件（见 analysis/loader.py）。两种方式都不整体载入内存。
+    只做获奖词汇分析时调用方传 columnar=False，不需要加载 numpy
+    """
     print("正在加载数据...")
-    with open('output/artists.json', 'r', encoding='utf-8') as f:
-        artists_data = json.load(f)
-    with open('output/songs.json', 'r', encoding='utf-8') as f:
-        songs_data = json.load(f)
-    print(f"加载完成: {len(artists_data)} 个艺术家, {len(songs_data)} 首歌曲")
+    artists_data, songs_data = JsonlFile(ARTISTS_PATH), JsonlFile(SONGS_PATH)
+    for data in (artists_data, songs_data):
+        if not data.exists():
+            raise FileNotFoundError(f"数据文件不存在: {data.path}")
+    if columnar:
+        from analysis.columnar import open_dataset  # 列式缓存依赖 numpy，用到时才导入
+        dataset = open_dataset(ARTISTS_PATH, SONGS_PATH, COLUMNAR_CACHE_DIR)
+        print(f"加载完成: {len(dataset.artists)} 个艺术家, {len(dataset.songs)} 首歌曲")
+        return dataset.artists, dataset.songs
+    print(f"数据文件: {artists_data.path} ({artists_data.size() / 1024:.1f} KB), {songs_data.path} ({songs_data.size() / 1024:.1f} KB)")
     return artists_data, songs_data
 
-def lyrics_wordcloud(songs_data):
-    print("\n=== 歌词词云分析 ===")
-    all_lyrics = []
-    for song in songs_data:
-        if 'lyrics' in song and song['lyrics']:
-            lyrics_text = ' '.join(song['lyrics'])
-            lyrics_text = re.sub(r'作词.*?编曲.*?', '', lyrics_text)
-            lyrics_text = re.sub(r'[^\u4e00-\u9fa5a-zA-Z\s]', '', lyrics_text)
-            all_lyrics.append(lyrics_text)
-    all_lyrics_text = ' '.join(all_lyrics)
-    words = jieba.cut(all_lyrics_text)
-    filtered_words = [w for w in words if len(w) > 1 and w.lower() not in STOPWORDS]
-    font_path_try = ['/System/Library/Fonts/STHeiti Medium.ttc', None]
-    wordcloud = None
-    for font_path in font_path_try:
-        try:
-            wordcloud = WordCloud(
-                font_path=font_path,
-                width=3000, height=1500, background_color='white', max_words=100, colormap='viridis'
-            ).generate(' '.join(filtered_words))
-            print(f"歌词词云生成成功，使用字体: {font_path}")
-            break
-        except Exception as e:
-            print(f"歌词词云生成失败，尝试字体: {font_path}, 错误: {e}")
-    if wordcloud is not None:
-        plt.figure(figsize=(12, 8))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        plt.title('歌词高频词云图', fontsize=16)
-        plt.savefig('lyrics_wordcloud.png', dpi=300, bbox_inches='tight')
-    else:
-        print("所有字体均失败，未生成歌词词云。")
+_token_cache = None
 
-def avg_line_length_hist(songs_data):
-    print("\n=== 歌曲平均句长分布统计（中文按汉字数，英文按单词数） ===")
-    zh_avg_lengths = []
-    en_avg_lengths = []
-    for song in songs_data:
-        if 'lyrics' in song and song['lyrics']:
-            lines = [line.strip() for line in song['lyrics'] if line.strip()]
-            if not lines:
-                continue
-            all_text = ''.join(lines)
-            zh_chars = len(re.findall(r'[\u4e00-\u9fa5]', all_text))
-            en_chars = len(re.findall(r'[A-Za-z]', all_text))
-            total_chars = len(all_text)
-            zh_ratio = zh_chars / (total_chars + 1e-6)
-            en_ratio = en_chars / (total_chars + 1e-6)  # 中文歌：汉字比例>0.3且英文比例<0.3
-            if zh_ratio > 0.3 and en_ratio < 0.3:
-                avg_len = np.mean([len(re.findall(r'[\u4e00-\u9fa5]', line)) for line in lines])
-                zh_avg_lengths.append(avg_len)  # 英文歌：英文比例>0.3且汉字比例<0.1
-            elif en_ratio > 0.3 and zh_ratio < 0.1:
-                avg_len = np.mean([len(re.findall(r'[A-Za-z]+', line)) for line in lines])
-                en_avg_lengths.append(avg_len)  # 其他语言跳过
-    if zh_avg_lengths:  # 中文直方图
-        plt.figure(figsize=(8,5))
-        plt.hist(zh_avg_lengths, bins=np.arange(4, 17, 0.5), color='#4e79a7', edgecolor='black', alpha=0.8)
-        plt.xlabel('每句平均汉字数')
-        plt.ylabel('歌曲数')
-        plt.title('中文歌每首歌平均句长分布')
-        plt.tight_layout()
-        plt.savefig('zh_avg_line_length_hist.png', dpi=300, bbox_inches='tight')
-        print("已保存中文歌每首歌平均句长分布直方图：zh_avg_line_length_hist.png")
-    else:
-        print("无中文歌曲数据")
-    if en_avg_lengths:  # 英文直方图
-        plt.figure(figsize=(8,5))
-        plt.hist(en_avg_lengths, bins=np.arange(2, 15, 0.5), color='#f28e2b', edgecolor='black', alpha=0.8)
-        plt.xlabel('每句平均单词数')
-        plt.ylabel('歌曲数')
-        plt.title('英文歌每首歌平均句长分布')
-        plt.tight_layout()
-        plt.savefig('en_avg_line_length_hist.png', dpi=300, bbox_inches='tight')
-        print("已保存英文歌每首歌平均句长分布直方图：en_avg_line_length_hist.png")
-    else:
-        print("无英文歌曲数据")
+def get_token_cache():  # 进程内共享的分词缓存（见 analysis/tokens.py），USE_TOKEN_CACHE 关闭时为 None
+    global _token_cache
+    if _token_cache is None and USE_TOKEN_CACHE:
+        _token_cache = TokenCache(TOKEN_CACHE_PATH)
+    return _token_cache
 
-def top_words_bar(songs_data):
-    print("\n=== 歌词高频词柱状图分析 ===")
-    from collections import Counter
-    all_lyrics = []
-    for song in songs_data:
-        if 'lyrics' in song and song['lyrics']:
-            lyrics_text = ' '.join(song['lyrics'])
-            lyrics_text = re.sub(r'作词.*?编曲.*?', '', lyrics_text)
-            lyrics_text = re.sub(r'[^\u4e00-\u9fa5a-zA-Z\s]', '', lyrics_text)
-            all_lyrics.append(lyrics_text)
-    all_lyrics_text = ' '.join(all_lyrics)
-    words = jieba.cut(all_lyrics_text)
-    filtered_words = [w for w in words if len(w) > 1 and w.lower() not in STOPWORDS]
-    word_counts = Counter(filtered_words)
-    top_words = word_counts.most_common(20)
-    if top_words:
-        words, counts = zip(*top_words)
-        # 词频标准化：除以总歌曲数2070，保留5位小数
-        total_songs = 2070
-        normalized_counts = [round(count / total_songs, 5) for count in counts]
-        plt.figure(figsize=(12, 8))
-        bars = plt.bar(range(len(words)), normalized_counts, color='#59a14f', alpha=0.8)
-        plt.xlabel('词语')
-        plt.ylabel('平均出现次数（每首歌）')
-        plt.title('歌词高频词TOP20（标准化）')
-        plt.xticks(range(len(words)), words, rotation=45, ha='right')
-        # 在柱子上显示数值
-        for bar, count in zip(bars, normalized_counts):
-            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.0001, 
-                    f'{count:.5f}', ha='center', va='bottom', fontsize=8)
-        plt.tight_layout()
-        plt.savefig('top_words_bar.png', dpi=300, bbox_inches='tight')
-        print("已保存歌词高频词柱状图：top_words_bar.png")
-    else:
-        print("无有效词语数据")
+def count_lyric_words(songs_data):
+    """
+    统计歌词词频（长度大于 1 且不在停用词表中的词），内存只保留词频表。
+    每首歌的分词结果来自分词缓存，词云和高频词柱状图共用，歌词没变的歌不会重复分词；
+    需要分词的歌按 JIEBA_WORKERS 分给多个进程。
+    清洗后的文本只含汉字、字母和空白，各首歌之间原本以空格拼接，jieba 不会跨空白切词，
+    所以逐首分词与把全部歌词拼成一段再分词的结果相同
+    """
+    cache = get_token_cache()
+    pool = make_pool(JIEBA_WORKERS) if JIEBA_WORKERS != 1 else None
+    try:
+        if cache is None and pool is not None:  # 不用缓存时子进程直接返回分片词频
+            return count_words_parallel(songs_data, STOPWORDS, pool)
+        before = dict(cache.stats) if cache is not None else None
+        word_counts = Counter()
+        for words in iter_song_tokens(songs_data, cache, pool=pool):
+            word_counts.update(w for w in words if keep_word(w, STOPWORDS))
+        if cache is not None:
+            print(f"分词缓存: 命中 {cache.stats['hit'] - before['hit']} 首, 新分词 {cache.stats['miss'] - before['miss']} 首")
+        return word_counts
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
-def award_analysis(artists_data):
-    print("\n=== 歌手获奖情况分析 ===")
-    
-    # 定义获奖相关词汇（中英文合并）
-    award_keywords = [
-        # 中文获奖词汇
-        '奖', '获奖', '得奖', '提名', '冠军', '亚军', '季军', '金牌', '银牌', '铜牌', 
-        '最佳', '优秀', '杰出', '卓越', '突出', '贡献', '成就', '荣誉', '称号',
-        '格莱美', '奥斯卡', '金曲奖', '金马奖', '金像奖', '金钟奖', '金鹰奖', '百花奖',
-        '华表奖', '飞天奖', '白玉兰', '金鸡奖', '金棕榈', '金熊奖', '金狮奖', '金球奖',
-        # 英文获奖词汇
-        'award', 'awards', 'winner', 'winning', 'won', 'nomination', 'nominated', 
-        'champion', 'championship', 'gold', 'silver', 'bronze', 'medal', 'medals',
-        'best', 'excellent', 'outstanding', 'distinguished', 'achievement', 'achievements',
-        'honor', 'honors', 'honour', 'honours', 'recognition',
-        'grammy', 'oscar', 'emmy', 'tony', 'pulitzer', 'nobel', 'academy', 'academies'
+def count_awards(artists_data):
+    # 统计每个歌手的获奖词汇出现次数：关键词表建成一个自动机，每份简介只扫描一遍（见 analysis/keywords.py）
+    matcher = KeywordMatcher(AWARD_KEYWORDS)
+    artists_with_bio = (artist for artist in artists_data if 'biography' in artist and artist['biography'])
+    return [
+        {'name': artist['name'], 'count': total_count}
+        for artist, total_count in iter_counts(matcher, artists_with_bio, key=lambda a: a['biography'], workers=AWARD_WORKERS)
+        if total_count > 0
     ]
-    
-    # 统计每个歌手的获奖词汇出现次数
-    artist_award_counts = []
-    
-    for artist in artists_data:
-        if 'biography' in artist and artist['biography']:
-            bio_text = artist['biography'].lower()
-            total_count = 0
-            
-            # 统计所有获奖词汇的出现次数
-            for keyword in award_keywords:
-                count = bio_text.count(keyword.lower())
-                total_count += count
-            
-            if total_count > 0:
-                artist_award_counts.append({
-                    'name': artist['name'],
-                    'count': total_count
-                })
-    
+
+def report_awards(artist_award_counts):  # 由每个歌手的获奖词汇次数输出统计，返回分布图的 (分组, 人数)，没有数据时返回 None
     print(f"有获奖信息的艺术家数量: {len(artist_award_counts)}")
     
     if artist_award_counts:
@@ -233,28 +172,11 @@ def award_analysis(artists_data):
                 groups.append(group)
                 numbers.append(group_distribution[group])
         
-        # 可视化：获奖次数分布柱状图
-        plt.figure(figsize=(12, 8))
-        bars = plt.bar(groups, numbers, color='#e15759', alpha=0.8, edgecolor='black')
-        plt.xlabel('获奖词汇出现次数')
-        plt.ylabel('歌手数量')
-        plt.title('歌手简介中获奖词汇出现次数分布')
-        plt.grid(True, alpha=0.3)
-        
-        # 在柱子上显示数值
-        for bar, count in zip(bars, numbers):
-            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, 
-                    str(count), ha='center', va='bottom', fontsize=10, fontweight='bold')
-        
-        plt.tight_layout()
-        plt.savefig('award_count_distribution.png', dpi=300, bbox_inches='tight')
-        print("已保存获奖次数分布图：award_count_distribution.png")
-        
         # 统计信息
         all_counts = [artist['count'] for artist in artist_award_counts]
         print(f"获奖词汇出现次数统计:")
-        print(f"平均次数: {np.mean(all_counts):.2f}")
-        print(f"中位数: {np.median(all_counts):.2f}")
+        print(f"平均次数: {statistics.mean(all_counts):.2f}")
+        print(f"中位数: {statistics.median(all_counts):.2f}")
         print(f"最多次数: {max(all_counts)}")
         print(f"最少次数: {min(all_counts)}")
         
@@ -269,28 +191,247 @@ def award_analysis(artists_data):
         for group in group_order:
             if group in group_distribution:
                 print(f"出现{group}次获奖词汇的歌手: {group_distribution[group]}人")
+        return groups, numbers
     else:
         print("没有找到包含获奖信息的歌手")
+        return None
+
+def _pyplot():  # 延迟导入 matplotlib，只有画图的进程才加载；后端由 analysis/runner.py 设为 Agg
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'PingFang HK']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
+def cloud_frequencies(word_counts, stopwords):
+    """
+    按 WordCloud.generate() 处理文本的方式整理词频（generate_from_frequencies 不做这些）：
+    去掉 wordcloud 自带的停用词；大小写不同的词合并，显示为最常见的写法；
+    以 s 结尾（ss 除外）且去掉 s 后也出现的词视为复数，并入单数。与 generate() 的区别只剩不统计双词搭配
+    """
+    stopwords = {w.lower() for w in stopwords}
+    variants = {}  # 小写形式 -> {写法: 次数}
+    for word, count in word_counts.items():
+        lower = word.lower()
+        if lower not in stopwords:
+            cases = variants.setdefault(lower, {})
+            cases[word] = cases.get(word, 0) + count
+    for lower in list(variants):
+        if lower.endswith('s') and not lower.endswith('ss') and lower[:-1] in variants:
+            singular = variants[lower[:-1]]
+            for word, count in variants.pop(lower).items():
+                singular[word[:-1]] = singular.get(word[:-1], 0) + count
+    return {max(cases.items(), key=lambda item: item[1])[0]: sum(cases.values()) for cases in variants.values()}
+
+def plot_wordcloud(word_counts):  # 由词频生成词云图
+    from wordcloud import STOPWORDS as CLOUD_STOPWORDS, WordCloud
+    plt = _pyplot()
+    frequencies = cloud_frequencies(word_counts, CLOUD_STOPWORDS)
+    font_path_try = ['/System/Library/Fonts/STHeiti Medium.ttc', None]
+    wordcloud = None
+    for font_path in font_path_try:
+        try:
+            wordcloud = WordCloud(
+                font_path=font_path,
+                width=3000, height=1500, background_color='white', max_words=100, colormap='viridis'
+            ).generate_from_frequencies(frequencies)
+            print(f"歌词词云生成成功，使用字体: {font_path}")
+            break
+        except Exception as e:
+            print(f"歌词词云生成失败，尝试字体: {font_path}, 错误: {e}")
+    if wordcloud is not None:
+        plt.figure(figsize=(12, 8))
+        plt.imshow(wordcloud, interpolation='bilinear')
+        plt.axis('off')
+        plt.title('歌词高频词云图', fontsize=16)
+        plt.savefig('lyrics_wordcloud.png', dpi=300, bbox_inches='tight')
+        plt.close()
+        return 'lyrics_wordcloud.png'
+    print("所有字体均失败，未生成歌词词云。")
+    return None
+
+def plot_top_words(word_counts):  # 由词频画 TOP20 柱状图
+    top_words = word_counts.most_common(20)
+    if top_words:
+        plt = _pyplot()
+        words, counts = zip(*top_words)
+        # 词频标准化：除以总歌曲数2070，保留5位小数
+        total_songs = 2070
+        normalized_counts = [round(count / total_songs, 5) for count in counts]
+        plt.figure(figsize=(12, 8))
+        bars = plt.bar(range(len(words)), normalized_counts, color='#59a14f', alpha=0.8)
+        plt.xlabel('词语')
+        plt.ylabel('平均出现次数（每首歌）')
+        plt.title('歌词高频词TOP20（标准化）')
+        plt.xticks(range(len(words)), words, rotation=45, ha='right')
+        # 在柱子上显示数值
+        for bar, count in zip(bars, normalized_counts):
+            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.0001, 
+                    f'{count:.5f}', ha='center', va='bottom', fontsize=8)
+        plt.tight_layout()
+        plt.savefig('top_words_bar.png', dpi=300, bbox_inches='tight')
+        plt.close()
+        print("已保存歌词高频词柱状图：top_words_bar.png")
+        return 'top_words_bar.png'
+    print("无有效词语数据")
+    return None
+
+LINE_LENGTH_HISTS = {  # 平均句长直方图：分箱、颜色、横轴、标题、文件名
+    'zh': (ZH_BINS, '#4e79a7', '每句平均汉字数', '中文歌每首歌平均句长分布', 'zh_avg_line_length_hist.png'),
+    'en': (EN_BINS, '#f28e2b', '每句平均单词数', '英文歌每首歌平均句长分布', 'en_avg_line_length_hist.png'),
+}
+
+def plot_line_length_hist(lang, hist):  # 由各箱的歌曲数画直方图，与直接对平均句长画图相同
+    bins, color, xlabel, title, filename = LINE_LENGTH_HISTS[lang]
+    plt = _pyplot()
+    plt.figure(figsize=(8,5))
+    edges = bin_edges(bins)
+    plt.hist(edges[:-1], bins=edges, weights=hist, color=color, edgecolor='black', alpha=0.8)
+    plt.xlabel(xlabel)
+    plt.ylabel('歌曲数')
+    plt.title(title)
+    plt.tight_layout()
+    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    plt.close()
+    print(f"已保存{title}直方图：{filename}")
+    return filename
+
+def plot_awards(groups, numbers):
+    plt = _pyplot()
+    # 可视化：获奖次数分布柱状图
+    plt.figure(figsize=(12, 8))
+    bars = plt.bar(groups, numbers, color='#e15759', alpha=0.8, edgecolor='black')
+    plt.xlabel('获奖词汇出现次数')
+    plt.ylabel('歌手数量')
+    plt.title('歌手简介中获奖词汇出现次数分布')
+    plt.grid(True, alpha=0.3)
+    
+    # 在柱子上显示数值
+    for bar, count in zip(bars, numbers):
+        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, 
+                str(count), ha='center', va='bottom', fontsize=10, fontweight='bold')
+    
+    plt.tight_layout()
+    plt.savefig('award_count_distribution.png', dpi=300, bbox_inches='tight')
+    plt.close()
+    print("已保存获奖次数分布图：award_count_distribution.png")
+    return 'award_count_distribution.png'
+
+def analysis_config():  # 增量状态依赖的分析配置，变化时增量状态作废
+    from analysis.incremental import fingerprint
+    return fingerprint(sorted(STOPWORDS), AWARD_KEYWORDS, bin_edges(ZH_BINS).tolist(), bin_edges(EN_BINS).tolist(),
+                       TOKENIZER_VERSION)
+
+ANALYSES = {  # 命令行可以选择的分析
+    'wordcloud': '歌词词云',
+    'top_words': '歌词高频词柱状图',
+    'line_length': '中英文歌平均句长分布直方图',
+    'awards': '歌手简介获奖词汇分布',
+}
+WORD_ANALYSES = ('wordcloud', 'top_words')
+SONG_ANALYSES = ('wordcloud', 'top_words', 'line_length')
+CHART_TOP_WORDS = 100  # 柱状图取前 20，只把前 100 个词传给画图进程；词云要先合并大小写和复数，传完整词频
+
+def line_length_stats(songs_data):  # 两种语言的平均句长直方图各箱歌曲数，以及各自的歌曲总数
+    import numpy as np
+    from analysis.lyric_stats import avg_line_lengths
+    zh_avg_lengths, en_avg_lengths = avg_line_lengths(songs_data)  # 向量化统计，见 analysis/lyric_stats.py
+    zh_hist = np.histogram(zh_avg_lengths, bins=bin_edges(ZH_BINS))[0]
+    en_hist = np.histogram(en_avg_lengths, bins=bin_edges(EN_BINS))[0]
+    return zh_hist, en_hist, len(zh_avg_lengths), len(en_avg_lengths)
+
+def compute_full(selected):  # 全量模式：只计算所选分析需要的统计
+    need_songs = any(name in selected for name in SONG_ANALYSES)
+    artists_data, songs_data = load_data(columnar=USE_COLUMNAR_CACHE and need_songs)
+    stats = {}
+    if any(name in selected for name in WORD_ANALYSES):
+        print("\n=== 歌词词频统计 ===")
+        stats['word_counts'] = count_lyric_words(songs_data)
+    if 'line_length' in selected:
+        stats['line_length'] = line_length_stats(songs_data)
+    if 'awards' in selected:
+        stats['award_counts'] = count_awards(artists_data)
+    return stats
+
+def compute_incremental(selected):
+    """
+    增量模式：只处理 songs.json / artists.json 上次分析之后追加的记录，
+    合并进保存的词频、直方图和获奖统计（见 analysis/incremental.py），再由合并后的状态出图。
+    歌曲的词频和直方图总是一起更新，避免高水位前移后某一项漏掉新增的歌
+    """
+    for path in (ARTISTS_PATH, SONGS_PATH):
+        if not Path(path).exists():
+            raise FileNotFoundError(f"数据文件不存在: {path}")
+    from analysis.incremental import AnalysisState
+    from analysis.lyric_stats import avg_line_lengths
+    state = AnalysisState(INCREMENTAL_STATE_PATH, analysis_config(), bin_edges(ZH_BINS), bin_edges(EN_BINS))
+    if any(name in selected for name in SONG_ANALYSES):
+        songs_data = state.pending('songs', SONGS_PATH)
+        print(f"增量分析: 歌曲数据新增 {songs_data.end - songs_data.start} 字节")
+        if songs_data.end > songs_data.start:
+            state.word_counts.update(count_lyric_words(songs_data))
+            state.add_line_lengths(*avg_line_lengths(songs_data))
+    if 'awards' in selected:
+        artists_data = state.pending('artists', ARTISTS_PATH)
+        print(f"增量分析: 歌手数据新增 {artists_data.end - artists_data.start} 字节")
+        if artists_data.end > artists_data.start:
+            state.award_counts.extend(count_awards(artists_data))
+    state.commit()
+    return {
+        'word_counts': state.word_counts,
+        'line_length': (state.zh_hist, state.en_hist, state.zh_songs, state.en_songs),
+        'award_counts': state.award_counts,
+    }
+
+def plan_charts(selected, stats):  # 输出文字统计，返回要渲染的图表任务 [(画图函数, 参数)]
+    jobs = []
+    if any(name in selected for name in WORD_ANALYSES):
+        if 'wordcloud' in selected:
+            jobs.append((plot_wordcloud, (stats['word_counts'],)))
+        if 'top_words' in selected:
+            jobs.append((plot_top_words, (Counter(dict(stats['word_counts'].most_common(CHART_TOP_WORDS))),)))
+    if 'line_length' in selected:
+        print("\n=== 歌曲平均句长分布统计（中文按汉字数，英文按单词数） ===")
+        zh_hist, en_hist, zh_songs, en_songs = stats['line_length']
+        print(f"中文歌 {zh_songs} 首, 英文歌 {en_songs} 首")
+        for lang, hist, songs, empty in (('zh', zh_hist, zh_songs, "无中文歌曲数据"), ('en', en_hist, en_songs, "无英文歌曲数据")):
+            if songs:
+                jobs.append((plot_line_length_hist, (lang, hist)))
+            else:
+                print(empty)
+    if 'awards' in selected:
+        print("\n=== 歌手获奖情况分析 ===")
+        chart = report_awards(stats['award_counts'])
+        if chart is not None:
+            jobs.append((plot_awards, chart))
+    return jobs
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="网易云音乐数据分析",
+        epilog="可选的分析: " + ", ".join(f"{name}（{desc}）" for name, desc in ANALYSES.items()),
+    )
+    parser.add_argument("analyses", nargs="*", metavar="ANALYSIS", help="要运行的分析，默认全部")
+    parser.add_argument("--incremental", action="store_true", help="只处理上次分析之后新增的记录，与保存的中间结果合并")
+    parser.add_argument("--workers", type=int, default=None, help="渲染图表的进程数，默认为 CPU 核数与图表数中较小的一个")
+    args = parser.parse_args()
+    unknown = [name for name in args.analyses if name not in ANALYSES]
+    if unknown:
+        parser.error(f"未知的分析: {', '.join(unknown)}，可选 {', '.join(ANALYSES)}")
+    selected = args.analyses or list(ANALYSES)
     print("网易云音乐数据分析开始...")
     try:
-        artists_data, songs_data = load_data()
-        lyrics_wordcloud(songs_data)
-        top_words_bar(songs_data)
-        avg_line_length_hist(songs_data)
-        award_analysis(artists_data)
+        stats = compute_incremental(selected) if args.incremental else compute_full(selected)
+        jobs = plan_charts(selected, stats)
+        print(f"\n=== 渲染 {len(jobs)} 张图表 ===")
+        charts = [chart for chart in render(jobs, args.workers) if chart]
         print("\n=== 分析完成 ===")
         print("生成的图表文件:")
-        print("- lyrics_wordcloud.png")
-        print("- top_words_bar.png")
-        print("- zh_avg_line_length_hist.png")
-        print("- en_avg_line_length_hist.png")
-        print("- award_count_distribution.png")
+        for chart in charts:
+            print(f"- {chart}")
     except Exception as e:
         print(f"分析过程中出现错误: {e}")
         import traceback
         traceback.print_exc()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+n-gram 子串索引基准测试
+在合成歌词语料上对比「候选求交 + 校验」与逐首 icontains 扫描，
+并校验两者命中结果完全一致。短于 MIN_QUERY_LEN 的查询线上直接扫表，这里仍测出索引耗时作对照
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from music.ngram_index import MIN_QUERY_LEN, NgramIndex, fold
+
+# 汉字按近似齐夫分布抽样，再混入英文词，组合成伪歌词
+HANZI = [chr(0x4e00 + i) for i in range(2000)]
+HANZI_WEIGHTS = [1 / (i + 1) for i in range(len(HANZI))]
+WORDS = ["love", "baby", "night", "Heart", "dream", "Fire", "you", "me", "sky", "rain"]
+
+
+def make_corpus(n_songs, seed=42):
+    rng = random.Random(seed)
+    corpus = []
+    for pk in range(1, n_songs + 1):
+        lines = []
+        for _ in range(rng.randint(15, 40)):
+            if rng.random() < 0.2:
+                lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7))))
+            else:
+                lines.append("".join(rng.choices(HANZI, HANZI_WEIGHTS, k=rng.randint(6, 14))))
+        name = "".join(rng.choices(HANZI, HANZI_WEIGHTS, k=rng.randint(2, 5)))
+        corpus.append((pk, name, "\n".join(lines)))
+    return corpus
+
+
+# 与 SQLite icontains 相同的语义：仅 ASCII 大小写不敏感；文本预先折叠，模拟数据库内部比较
+def scan(folded, q):
+    fq = fold(q)
+    return {pk for pk, (name, lyrics) in folded.items() if fq in name or fq in lyrics}
+
+
+def indexed(index, folded, q):
+    fq = fold(q)
+    return {pk for pk in index.candidates(q) if fq in folded[pk][0] or fq in folded[pk][1]}
+
+
+def main(n_songs=20000, n_queries=200):
+    corpus = make_corpus(n_songs)
+    folded = {pk: (fold(name), fold(lyrics)) for pk, name, lyrics in corpus}
+    t0 = time.perf_counter()
+    index = NgramIndex.build(corpus)
+    print(f"语料: {n_songs} 首, 建索引耗时 {time.perf_counter() - t0:.2f} 秒, 片段数 {len(index.postings)}")
+
+    rng = random.Random(7)
+    queries = ["LOVE", "baby night", "Heart", "z"]
+    for _ in range(n_queries):
+        pk, name, lyrics = rng.choice(corpus)
+        start = rng.randrange(len(lyrics))
+        queries.append(lyrics[start:start + rng.randint(1, 6)])
+
+    timings = {}  # 查询长度 -> ([扫描耗时], [索引耗时])
+    for q in queries:
+        t0 = time.perf_counter()
+        expected = scan(folded, q)
+        t1 = time.perf_counter()
+        got = indexed(index, folded, q)
+        t2 = time.perf_counter()
+        assert got == expected, f"结果不一致: {q!r}"
+        scan_times, index_times = timings.setdefault(min(len(q), 4), ([], []))
+        scan_times.append(t1 - t0)
+        index_times.append(t2 - t1)
+
+    # 命中大半语料的高频查询两种方式都要逐行比较，用中位数反映典型查询
+    print(f"查询 {len(queries)} 次，结果全部一致（耗时为中位数）")
+    for length in sorted(timings):
+        scan_times, index_times = timings[length]
+        scan_ms = statistics.median(scan_times) * 1000
+        index_ms = statistics.median(index_times) * 1000
+        label = f"{length}+" if length == 4 else str(length)
+        note = "（线上直接扫表）" if length < MIN_QUERY_LEN else ""
+        print(f"查询长度 {label}: {len(scan_times)} 次, 全表扫描 {scan_ms:.2f} ms, "
+              f"n-gram 索引 {index_ms:.3f} ms, 加速 {scan_ms / max(index_ms, 1e-6):.1f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
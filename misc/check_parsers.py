@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+页面解析后端校验与基准测试
+1. golden 校验：misc/parser_golden/*.html 的期望输出记录在 golden.json（由 bs4 后端生成），
+   每个后端的输出都必须与之完全一致
+2. 如果有响应缓存（spider.HTML_DIR），再用缓存中的全部歌手页/歌曲页对比两个后端
+3. 基准：每个页面各解析若干次，报告中位数耗时
+用法: python misc/check_parsers.py [--update] [--repeat 20]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import spider
+from crawler.http_cache import ResponseCache
+from crawler.parsers import BACKENDS
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "parser_golden"
+GOLDEN_FILE = GOLDEN_DIR / "golden.json"
+REFERENCE = "bs4"
+
+
+def parse_all(backend, html):  # 每个页面都用两种解析函数跑一遍，golden 同时覆盖两者
+    parse_artist, parse_song = BACKENDS[backend]
+    return {"artist": parse_artist(html), "song": parse_song(html)}
+
+
+def load_pages():
+    return {p.name: p.read_text(encoding="utf-8") for p in sorted(GOLDEN_DIR.glob("*.html"))}
+
+
+def check_golden(pages, update):
+    if update:
+        golden = {name: parse_all(REFERENCE, html) for name, html in pages.items()}
+        GOLDEN_FILE.write_text(json.dumps(golden, ensure_ascii=False, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"已用 {REFERENCE} 后端更新 {GOLDEN_FILE.name}（{len(golden)} 个页面）")
+    golden = json.loads(GOLDEN_FILE.read_text(encoding="utf-8"))
+    assert set(golden) == set(pages), "golden.json 与页面文件不一致，请运行 --update"
+    failures = 0
+    for backend in BACKENDS:
+        for name, html in pages.items():
+            got = parse_all(backend, html)
+            if got != golden[name]:
+                failures += 1
+                print(f"[{backend}] {name} 不一致:\n  期望 {golden[name]}\n  实际 {got}")
+    print(f"golden 校验: {len(pages)} 个页面 x {len(BACKENDS)} 个后端，失败 {failures}")
+    return failures
+
+
+def check_cache():  # 用缓存中的真实页面逐个对比
+    db = Path(spider.HTML_DIR) / "responses.sqlite3"
+    if not db.exists():
+        print("没有响应缓存，跳过真实页面对比")
+        return 0
+    cache = ResponseCache(spider.HTML_DIR, offline=True)
+    failures = checked = 0
+    try:
+        for prefix, kind in ((f"{spider.SITE_URL}/artist/desc?id=", "artist"), (f"{spider.SITE_URL}/song?id=", "song")):
+            for url in cache.urls(prefix):
+                entry = cache.get(url)
+                if entry.status != 200:
+                    continue
+                html = entry.body.decode("utf-8", errors="replace")
+                results = {b: BACKENDS[b][0 if kind == "artist" else 1](html) for b in BACKENDS}
+                checked += 1
+                if any(r != results[REFERENCE] for r in results.values()):
+                    failures += 1
+                    print(f"{url} 不一致: {results}")
+    finally:
+        cache.close()
+    print(f"缓存页面对比: {checked} 个页面，失败 {failures}")
+    return failures
+
+
+def bench(pages, repeat):
+    print(f"\n{'页面':<28}{'KB':>6}" + "".join(f"{b + ' ms':>12}" for b in BACKENDS) + f"{'加速':>8}")
+    totals = dict.fromkeys(BACKENDS, 0.0)
+    for name, html in pages.items():
+        kind = 0 if name.startswith("artist") else 1
+        row = {}
+        for backend in BACKENDS:
+            parse = BACKENDS[backend][kind]
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                parse(html)
+                times.append(time.perf_counter() - start)
+            row[backend] = statistics.median(times) * 1000
+            totals[backend] += row[backend]
+        speedup = row[REFERENCE] / row["regex"] if row["regex"] else float("inf")
+        print(f"{name:<28}{len(html.encode()) / 1024:>6.1f}" + "".join(f"{row[b]:>12.3f}" for b in BACKENDS) + f"{speedup:>7.1f}x")
+    print(f"{'合计':<28}{'':>6}" + "".join(f"{totals[b]:>12.3f}" for b in BACKENDS)
+          + f"{totals[REFERENCE] / totals['regex']:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="用 bs4 后端重新生成 golden.json")
+    parser.add_argument("--repeat", type=int, default=20, help="基准测试每个页面的解析次数")
+    args = parser.parse_args()
+
+    pages = load_pages()
+    failures = check_golden(pages, args.update) + check_cache()
+    bench(pages, args.repeat)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+用本地桩服务器检查异步爬虫引擎：模拟歌手分类页、歌手页、歌曲页、歌词接口和图片，
+统计每个时刻的并发请求数，确认单域名并发上限和限速生效、输出文件格式与原爬虫一致，
+并模拟中途中断（包括记录已写出、任务尚未记完成时被杀）后重跑，确认从断点继续、记录不重复；最后检查响应缓存的条件请求、离线重新解析和离线回放
+用法: python misc/crawl_stub_check.py
+"""
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import spider
+from crawler.engine import AsyncCrawler, replay
+from crawler.http_cache import ResponseCache
+from crawler.reparse import reparse
+
+N_ARTISTS = 6
+SONGS_PER_ARTIST = 5
+LATENCY = 0.05
+
+state = {"active": 0, "peak": 0, "requests": 0, "song_pages": 0, "not_modified": 0}
+lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        # 图片请求在线程池里用 requests 发出（线上图片也不在同一域名），不经过引擎，不计入并发
+        counted = not self.path.startswith("/img/")
+        with lock:
+            state["requests"] += 1
+            if self.path.startswith("/song?"):
+                state["song_pages"] += 1
+            if counted:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+        try:
+            time.sleep(LATENCY)
+            body, ctype = self.route()
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = '"%x"' % zlib.crc32(body)
+            if self.headers.get("If-None-Match") == etag:
+                with lock:
+                    state["not_modified"] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 中断测试中客户端被取消
+        finally:
+            if counted:
+                with lock:
+                    state["active"] -= 1
+
+    def route(self):
+        parts = urlsplit(self.path)
+        qid = parse_qs(parts.query).get("id", [""])[0]
+        host = f"http://{self.headers['Host']}"
+        html = "text/html; charset=utf-8"
+        if parts.path == "/discover/artist/cat":
+            links = "".join(f'<a href="/artist?id={i}">a</a>' for i in range(1, N_ARTISTS + 1))
+            return links.encode(), html
+        if parts.path == "/artist/desc":
+            return (f'<meta name="keywords" content="歌手{qid}"><img src="{host}/img/a{qid}.jpg">'
+                    f'<div class="n-artdesc">简介{qid}</div>').encode(), html
+        if parts.path == "/artist":
+            links = "".join(f'<a href="/song?id={qid}{j:02d}">s</a>' for j in range(SONGS_PER_ARTIST))
+            return links.encode(), html
+        if parts.path == "/song":
+            return (f'<meta property="og:title" content="歌曲{qid}">'
+                    f'<meta property="og:music:artist" content="歌手{qid[:-2]}">'
+                    f'<meta property="og:image" content="{host}/img/s{qid}.jpg">').encode(), html
+        if parts.path == "/api/song/lyric":
+            return json.dumps({"lrc": {"lyric": f"[00:01.00]第一句{qid}\n[00:02.00]第二句"}}).encode(), "application/json"
+        if parts.path.startswith("/img/"):
+            # 同一歌手的歌曲封面 URL 不同但内容相同，检验按内容去重
+            name = Path(parts.path).stem
+            owner = name[1:] if name.startswith("a") else name[1:-2]
+            return b"\xff\xd8" + f"{name[0]}{owner}".encode() * 2000, "image/jpeg"
+        return None, None
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    per_host_limit = 3
+    with tempfile.TemporaryDirectory() as tmp:
+        crawler = AsyncCrawler(base_url=base_url, out_dir=tmp, concurrency=8,
+                               per_host_limit=per_host_limit, rate=200, burst=10)
+        start = time.perf_counter()
+        artists, songs = asyncio.run(crawler.run())
+        elapsed = time.perf_counter() - start
+
+        out = Path(tmp)
+        artist_rows = [json.loads(l) for l in (out / "artists.json").read_text(encoding="utf-8").splitlines()]
+        song_rows = [json.loads(l) for l in (out / "songs.json").read_text(encoding="utf-8").splitlines()]
+        images = sorted(p.relative_to(out).as_posix() for d in ("artist_images", "song_images")
+                        for p in (out / d).rglob("*.jpg"))
+        blobs = list((out / "images").rglob("*.jpg"))
+
+        print(f"歌手 {artists}，歌曲 {songs}，请求 {state['requests']} 次，耗时 {elapsed:.2f}s")
+        print(f"桩服务器峰值并发 {state['peak']}（单域名上限 {per_host_limit}）")
+        print(f"图片 {len(images)} 张，内容文件 {len(blobs)} 个，例如 {images[:2]}")
+        print("歌曲记录示例:", song_rows[0])
+
+        assert artists == N_ARTISTS and songs == N_ARTISTS * SONGS_PER_ARTIST
+        assert len(artist_rows) == artists and len(song_rows) == songs
+        assert state["peak"] <= per_host_limit
+        assert all(r["source_url"].startswith(spider.SITE_URL) for r in artist_rows + song_rows)
+        assert len(images) == artists + songs
+        assert len(blobs) == 2 * N_ARTISTS
+        assert (out / images[0]).read_bytes().startswith(b"\xff\xd8a1")
+
+        # 再跑一次：队列里全部完成，只重新抓分类页
+        state["requests"] = 0
+        again = asyncio.run(AsyncCrawler(base_url=base_url, out_dir=tmp, rate=200, burst=10).run())
+        assert again == (0, 0), again
+        print(f"重跑跳过全部已完成任务，请求 {state['requests']} 次")
+
+    check_resume(base_url)
+    check_kill_before_checkpoint(base_url)
+    with tempfile.TemporaryDirectory() as tmp:
+        check_cache(base_url, Path(tmp), server)
+    print("OK")
+
+
+def check_resume(base_url):  # 中途取消（模拟进程被杀）后重跑，应从断点继续且歌曲不重复
+    concurrency = 4
+    with tempfile.TemporaryDirectory() as tmp:
+        state["song_pages"] = 0
+        crawler = AsyncCrawler(base_url=base_url, out_dir=tmp, concurrency=concurrency, rate=200, burst=10)
+
+        async def interrupted():
+            run = asyncio.ensure_future(crawler.run())
+            while crawler.song_cnt < 8:
+                await asyncio.sleep(0.01)
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+
+        asyncio.run(interrupted())
+        first = len((Path(tmp) / "songs.json").read_text(encoding="utf-8").splitlines())
+        artists, songs = asyncio.run(AsyncCrawler(base_url=base_url, out_dir=tmp, concurrency=concurrency,
+                                                  rate=200, burst=10).run())
+        rows = [json.loads(l) for l in (Path(tmp) / "songs.json").read_text(encoding="utf-8").splitlines()]
+        urls = [r["source_url"] for r in rows]
+        print(f"中断前写入 {first} 首，续跑新增 {songs} 首，歌曲页请求 {state['song_pages']} 次")
+        assert len(urls) == len(set(urls)) == N_ARTISTS * SONGS_PER_ARTIST
+        assert state["song_pages"] <= N_ARTISTS * SONGS_PER_ARTIST + concurrency
+        assert len(list((Path(tmp) / "song_images").rglob("*.jpg"))) == N_ARTISTS * SONGS_PER_ARTIST
+
+
+class KilledBeforeCheckpoint(AsyncCrawler):
+    def checkpoint(self):  # 模拟每次写出记录后、记为完成之前进程被杀：只写出，任务一个都不记完成
+        for writer in self._writers.values():
+            writer.flush()
+        self._done = []
+
+
+def check_kill_before_checkpoint(base_url):  # 记录已写出但任务未记完成时重跑，不应重复抓取、重复写入
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(KilledBeforeCheckpoint(base_url=base_url, out_dir=tmp, rate=200, burst=10).run())
+        again = asyncio.run(AsyncCrawler(base_url=base_url, out_dir=tmp, rate=200, burst=10).run())
+        for filename, n in (("artists.json", N_ARTISTS), ("songs.json", N_ARTISTS * SONGS_PER_ARTIST)):
+            urls = [json.loads(l)["source_url"] for l in (Path(tmp) / filename).read_text(encoding="utf-8").splitlines()]
+            assert len(urls) == len(set(urls)) == n, (filename, len(urls), len(set(urls)))
+        print(f"写出后未记完成即中断，重跑新增 {again[0]} 位歌手、{again[1]} 首歌曲")
+        assert again == (0, 0), again
+
+
+def song_rows(out):
+    return sorted((out / "songs.json").read_text(encoding="utf-8").splitlines())
+
+
+def check_cache(base_url, tmp, server):  # 带缓存抓取 -> 条件请求重新验证 -> 关掉服务器离线回放
+    cache = ResponseCache(tmp / "cache")
+    asyncio.run(AsyncCrawler(base_url=base_url, out_dir=tmp / "a", cache=cache, rate=200, burst=10).run())
+    stored = len(cache)
+
+    state["not_modified"] = 0
+    asyncio.run(AsyncCrawler(base_url=base_url, out_dir=tmp / "b", cache=cache, rate=200, burst=10).run())
+    cache.close()
+    print(f"缓存 {stored} 个响应，重新验证时服务器返回 304 {state['not_modified']} 次")
+    assert state["not_modified"] == stored
+    assert song_rows(tmp / "a") == song_rows(tmp / "b")
+
+    server.shutdown()
+    server.server_close()
+    for kind, filename in (("song", "songs.json"), ("artist", "artists.json")):
+        parsed, written = reparse(kind, tmp / "re" / filename, cache_dir=tmp / "cache", workers=2, chunk_size=4,
+                                  base_url=base_url)
+        print(f"离线重新解析 {kind}: {parsed} 个页面，写出 {written} 条")
+        expected = sorted((tmp / "a" / filename).read_text(encoding="utf-8").splitlines())
+        assert sorted((tmp / "re" / filename).read_text(encoding="utf-8").splitlines()) == expected
+
+    start = time.perf_counter()
+    artists, songs = replay(tmp / "c", cache_dir=tmp / "cache", base_url=base_url)
+    print(f"离线回放 {artists} 位歌手，{songs} 首歌曲，耗时 {time.perf_counter() - start:.2f}s")
+    assert song_rows(tmp / "a") == song_rows(tmp / "c")
+
+
+if __name__ == "__main__":
+    main()
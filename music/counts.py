@@ -0,0 +1,55 @@
+"""
+分页总数缓存
+未过滤的 Song/Artist 总数由 save/delete 信号增量维护，同样只缓存 TTL 秒：
+信号只修正本进程的缓存，其他进程、导入脚本和管理命令的写入要等过期后才反映出来；
+带搜索条件的计数按规范化后的查询缓存，超过 TTL 后重新计算。
+计数只用于渲染页码，允许在多进程部署下短暂偏差。
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .ngram_index import fold
+
+
+def _total_key(model):
+    return f"count:total:{model._meta.label_lower}"
+
+
+def _ttl():
+    return getattr(settings, "COUNT_CACHE_TTL", 300)
+
+
+def total(model):  # 返回全表行数，缓存缺失或过期时重新计算
+    key = _total_key(model)
+    n = cache.get(key)
+    if n is None:
+        n = model.objects.count()
+        cache.set(key, n, _ttl())
+    return n
+
+
+def adjust(model, delta):  # 信号调用：新增 +1 / 删除 -1；缓存尚未建立时无需处理
+    try:
+        cache.incr(_total_key(model), delta)
+    except ValueError:
+        pass
+
+
+def reset(*models):  # bulk_create 等不触发信号的批量写入后调用
+    cache.delete_many([_total_key(m) for m in models])
+
+
+def normalize_query(q):  # 与 icontains 语义一致：只去掉首尾空白（中间的空白有意义），仅折叠 ASCII 大小写
+    return fold(q.strip())
+
+
+def filtered(mode, q, queryset):  # 返回带搜索条件的计数，按 (mode, 规范化查询) 缓存 TTL 秒
+    digest = hashlib.md5(normalize_query(q).encode("utf-8")).hexdigest()
+    key = f"count:search:{mode}:{digest}"
+    n = cache.get(key)
+    if n is None:
+        n = queryset.count()
+        cache.set(key, n, _ttl())
+    return n
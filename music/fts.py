@@ -0,0 +1,142 @@
+"""
+SQLite FTS5 全文索引
+对歌曲名、歌词、歌手名建立 trigram 虚拟表，供 search() 做排序检索，
+避免每次查询都对整张 Song 表做 LIKE 扫描。
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+FTS_TABLE = "music_song_fts"
+MIN_QUERY_LEN = 3  # trigram 分词器要求查询至少 3 个字符
+
+
+def fts_available():  # 当前数据库是否支持（并已创建）FTS 表
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=%s", [FTS_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def create_table(schema_editor=None):  # 创建 FTS 虚拟表，迁移和重建命令共用
+    conn = schema_editor.connection if schema_editor else connection
+    if conn.vendor != "sqlite":
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(name, lyrics, artist_name, tokenize='trigram')"
+        )
+
+
+def drop_table(schema_editor=None):
+    conn = schema_editor.connection if schema_editor else connection
+    if conn.vendor != "sqlite":
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _song_rows(song_ids=None, artist_id=None):  # 读取需要写入索引的 (id, 歌名, 歌词, 歌手名)
+    from .models import Song
+    qs = Song.objects.select_related("artist")
+    if song_ids is not None:
+        qs = qs.filter(pk__in=song_ids)
+    if artist_id is not None:
+        qs = qs.filter(artist_id=artist_id)
+    for song in qs.only("id", "name", "lyrics", "artist__name").iterator(chunk_size=2000):
+        yield song.id, song.name, song.lyrics, song.artist.name
+
+
+def _write_rows(cursor, rows):
+    rows = list(rows)
+    if not rows:
+        return
+    cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(r[0],) for r in rows])
+    cursor.executemany(
+        f"INSERT INTO {FTS_TABLE}(rowid, name, lyrics, artist_name) VALUES (%s, %s, %s, %s)",
+        rows,
+    )
+
+
+def index_songs(song_ids):  # 增量更新指定歌曲的索引行
+    if not song_ids or not fts_available():
+        return
+    with connection.cursor() as cursor:
+        _write_rows(cursor, _song_rows(song_ids=list(song_ids)))
+
+
+def index_artist_songs(artist_id):  # 歌手改名后，同步其全部歌曲的 artist_name 列
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        _write_rows(cursor, _song_rows(artist_id=artist_id))
+
+
+def remove_songs(song_ids):
+    if not song_ids or not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(i,) for i in song_ids])
+
+
+def rebuild(batch_size=2000):  # 清空并从 Song 表全量重建索引，返回写入行数
+    if connection.vendor != "sqlite":
+        return 0
+    total = 0
+    with transaction.atomic():
+        drop_table()
+        create_table()
+        with connection.cursor() as cursor:
+            batch = []
+            for row in _song_rows():
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    cursor.executemany(
+                        f"INSERT INTO {FTS_TABLE}(rowid, name, lyrics, artist_name) VALUES (%s, %s, %s, %s)",
+                        batch,
+                    )
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE}(rowid, name, lyrics, artist_name) VALUES (%s, %s, %s, %s)",
+                    batch,
+                )
+                total += len(batch)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _phrase(q):  # 整体作为短语匹配，语义与 icontains 一致
+    return '"' + q.replace('"', '""') + '"'
+
+
+def search_song_ids(q, limit=None):
+    """
+    按 bm25 相关度返回匹配歌曲的 id 列表，最多 limit（默认 SEARCH_RESULT_LIMIT）个，
+    结果被截断时用 count_song_ids() 取匹配总数；
+    无法使用索引（非 SQLite、表未建、查询过短）时返回 None，由调用方回退到 LIKE 查询
+    """
+    q = q.strip()
+    if len(q) < MIN_QUERY_LEN or not fts_available():
+        return None
+    if limit is None:
+        limit = getattr(settings, "SEARCH_RESULT_LIMIT", 1000)
+    phrase = _phrase(q)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [phrase, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def count_song_ids(q):  # 匹配的歌曲总数（不受 limit 限制）
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_phrase(q.strip())]
+        )
+        return cursor.fetchone()[0]
@@ -0,0 +1,88 @@
+"""
+图片目录清单
+每个目录只 os.listdir 一次，建立「小写文件名 -> 文件名」映射，以及模糊匹配用的
+「规范化文件名 -> 位置」映射和 bigram 倒排表。导入器按歌手名/歌名匹配图片时
+不再每首歌遍历整个目录，匹配结果与逐个遍历时完全一致（同样返回目录顺序中的第一个）。
+"""
+import os
+import string
+
+_PUNCTUATION = set(string.punctuation)
+
+
+def normalize_name(name):  # 标准化名称用于模糊匹配，去除特殊字符和空格
+    name = name.lower()
+    name = name.replace(' ', '').replace('_', '').replace('-', '')
+    name = ''.join(c for c in name if c not in _PUNCTUATION)
+    return name
+
+
+def _query_grams(text):
+    if len(text) >= 2:
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+    return {text}
+
+
+class ImageCatalog:
+    def __init__(self, directory, suffix='.jpg'):
+        self.directory = directory
+        self.files = os.listdir(directory) if os.path.isdir(directory) else []
+        self.suffix = suffix
+
+        # 大小写不敏感的精确匹配：保留目录顺序中第一个
+        self._by_lower = {}
+        for file in self.files:
+            self._by_lower.setdefault(file.lower(), file)
+
+        # 模糊匹配：只考虑指定后缀的文件，按目录顺序编号
+        self._fuzzy_files = [f for f in self.files if f.lower().endswith(suffix)]
+        self._norms = [normalize_name(os.path.splitext(f)[0]) for f in self._fuzzy_files]
+        self._by_norm = {}
+        self._grams = {}
+        for pos, norm in enumerate(self._norms):
+            self._by_norm.setdefault(norm, pos)
+            for gram in set(norm) | {norm[i:i + 2] for i in range(len(norm) - 1)}:
+                self._grams.setdefault(gram, []).append(pos)
+        self._fuzzy_cache = {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def find_case_insensitive(self, filename):  # 等价于遍历目录比较 file.lower() == filename.lower()
+        return self._by_lower.get(filename.lower())
+
+    def fuzzy_find(self, name):
+        """
+        返回目录顺序中第一个满足「规范化名称互相包含」的文件，找不到返回 None
+        """
+        norm = normalize_name(name)
+        if norm in self._fuzzy_cache:
+            return self._fuzzy_cache[norm]
+        best = self._contains_pos(norm)
+        # 文件名被包含在名称里：枚举名称的所有子串（名称很短）查表
+        for i in range(len(norm) + 1):
+            for j in range(i, len(norm) + 1):
+                pos = self._by_norm.get(norm[i:j])
+                if pos is not None and (best is None or pos < best):
+                    best = pos
+        result = self._fuzzy_files[best] if best is not None else None
+        self._fuzzy_cache[norm] = result
+        return result
+
+    def _contains_pos(self, norm):  # 名称被包含在文件名里：bigram 倒排表求交后校验
+        if not self._norms:
+            return None
+        if not norm:
+            return 0
+        lists = []
+        for gram in _query_grams(norm):
+            posting = self._grams.get(gram)
+            if posting is None:
+                return None
+            lists.append(posting)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for posting in lists[1:]:
+            candidates.intersection_update(posting)
+        matches = [pos for pos in candidates if norm in self._norms[pos]]
+        return min(matches) if matches else None
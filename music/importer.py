@@ -0,0 +1,306 @@
+"""
+songs.json 批量导入流水线
+先把已有歌手（按名称）和本批歌曲（按 source_url）预读到字典，在内存中比对，
+再按批用 bulk_create / bulk_update 写入，每批一个事务，批大小可配置。
+"""
+import json
+import os
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import counts, fts, search_engine
+from .image_catalog import ImageCatalog
+from .models import Artist, Song
+
+ALIAS_SPLIT_RE = re.compile(r'[\/，,、\s]+')
+SONG_UPDATE_FIELDS = ['artist', 'name', 'lyrics', 'cover_img', 'has_image', 'image_checked_at']
+ARTIST_UPDATE_FIELDS = ['biography', 'profile_img', 'source_url', 'has_image', 'image_checked_at']
+
+
+def safe_filename(name):  # 生成安全的文件名，替换不安全的字符为下划线
+    safe_name = name.replace('/', '_').replace('\\', '_').replace(':', '_').replace('*', '_').replace('?', '_').replace('"', '_').replace('<', '_').replace('>', '_').replace('|', '_')
+    return safe_name.strip()
+
+
+def load_artist_aliases(artist_json_path):  # 读取 artists.json，构建别名到主名的映射
+    artist_alias_to_main = {}
+    if os.path.exists(artist_json_path):
+        with open(artist_json_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                artist_obj = json.loads(line)
+                # 主名为第一个
+                main_name = ALIAS_SPLIT_RE.split(artist_obj['name'])[0].strip()
+                # 分割所有别名
+                for alias in ALIAS_SPLIT_RE.split(artist_obj['name']):
+                    alias = alias.strip()
+                    if alias:
+                        artist_alias_to_main[alias] = main_name
+    return artist_alias_to_main
+
+
+def get_main_artist(artist_name, artist_alias_to_main):  # 获取主歌手名，处理包含多个别名的歌手名称
+    for candidate in ALIAS_SPLIT_RE.split(artist_name):
+        candidate = candidate.strip()
+        if candidate in artist_alias_to_main:
+            return artist_alias_to_main[candidate]
+    # 如果都找不到，fallback：取第一个
+    return ALIAS_SPLIT_RE.split(artist_name)[0].strip()
+
+
+def read_song_records(json_file_path):  # 逐行读取JSON文件（每行一个JSON对象），跳过格式错误的行
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"警告: 第{line_num}行JSON格式错误: {e}")
+                    continue
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class SongImporter:
+    """
+    按批导入歌曲；stats 记录新增/更新/已存在/失败等计数，供视图生成报告
+    """
+
+    def __init__(self, artist_alias_to_main, chunk_size=None, media_root=None):
+        self.artist_alias_to_main = artist_alias_to_main
+        self.chunk_size = chunk_size or getattr(settings, 'IMPORT_CHUNK_SIZE', 500)
+        media_root = media_root or settings.MEDIA_ROOT
+        # 图片目录只列一次，之后每首歌的匹配都是查表
+        self.artist_images = ImageCatalog(os.path.join(media_root, "artist_images"))
+        self.song_images = ImageCatalog(os.path.join(media_root, "song_images"))
+        self.stats = {
+            'songs_added': 0,
+            'songs_updated': 0,
+            'songs_exist': 0,
+            'songs_error': 0,
+            'artists_created': 0,
+            'artists_updated': 0,
+        }
+        self.errors = []
+        # 预读全部已有歌手，名称重复时保留 id 最小的一条
+        self.artists = {}
+        for artist in Artist.objects.order_by('-id'):
+            self.artists[artist.name] = artist
+        self.artist_source_urls = {a.source_url for a in self.artists.values()}
+        self._processed = 0
+
+    def run(self, records, progress=None):  # records: 可迭代的歌曲字典；progress(已处理数, stats) 每批回调一次
+        for chunk in _chunks(records, self.chunk_size):
+            self._import_chunk(chunk)
+            if progress is not None:
+                progress(self._processed, self.stats)
+        counts.reset(Song, Artist)  # 批量写入不触发信号，总数缓存需要重建
+        return self.stats
+
+    def _error(self, index, song_data, reason):
+        self.errors.append(
+            f"第{index + 1}首歌曲处理失败 ({song_data.get('name', '未知')} - {song_data.get('artist_name', '未知')}): {reason}"
+        )
+        self.stats['songs_error'] += 1
+
+    def _prepare(self, index, song_data):  # 校验并解析一条记录，返回规范化后的字段；失败返回 None
+        required_fields = ['name', 'artist_name', 'source_url']
+        missing_fields = [field for field in required_fields if field not in song_data or not song_data[field]]
+        if missing_fields:
+            self.errors.append(f"第{index + 1}首歌曲缺少必要字段: {', '.join(missing_fields)}")
+            self.stats['songs_error'] += 1
+            return None
+
+        # 只用主歌手名
+        main_artist_name = get_main_artist(song_data['artist_name'], self.artist_alias_to_main)
+        expected_song_img = f"{safe_filename(song_data['name'])}.jpg"
+        # 用 fuzzy 匹配 artist 图片，歌曲图片用大小写不敏感的严格匹配
+        found_artist_img = self.artist_images.fuzzy_find(main_artist_name)
+        found_song_img = self.song_images.find_case_insensitive(expected_song_img)
+
+        lyrics = song_data.get('lyrics', '')
+        if isinstance(lyrics, list):
+            lyrics = '\n'.join(lyrics)
+        else:
+            lyrics = str(lyrics) if lyrics else ''
+
+        return {
+            'artist_name': main_artist_name,
+            'found_artist_img': found_artist_img,
+            'profile_img': f"artist_images/{found_artist_img}" if found_artist_img else "",
+            'found_song_img': found_song_img,
+            'cover_img': f"song_images/{found_song_img}" if found_song_img else "",
+            'lyrics': lyrics,
+        }
+
+    def _import_chunk(self, chunk):
+        now = timezone.now()
+        base = self._processed
+        self._processed += len(chunk)
+
+        rows = []
+        for offset, song_data in enumerate(chunk):
+            index = base + offset
+            try:
+                prepared = self._prepare(index, song_data)
+            except Exception as e:
+                self._error(index, song_data, e)
+                continue
+            if prepared is not None:
+                rows.append((index, song_data, prepared))
+
+        # 1. 歌手：内存中比对，新建的统一 bulk_create，需要补全的统一 bulk_update
+        new_artists = {}
+        updated_artists = {}
+        for index, song_data, prepared in list(rows):
+            name = prepared['artist_name']
+            artist = self.artists.get(name) or new_artists.get(name)
+            if artist is None:
+                source_url = song_data.get('artist_source_url', song_data['source_url'])
+                if source_url in self.artist_source_urls:
+                    rows.remove((index, song_data, prepared))
+                    self._error(index, song_data, f"歌手 source_url 已被其他歌手使用: {source_url}")
+                    continue
+                self.artist_source_urls.add(source_url)
+                new_artists[name] = Artist(
+                    name=name,
+                    biography=song_data.get('biography', ''),
+                    profile_img=prepared['profile_img'],
+                    source_url=source_url,
+                    has_image=bool(prepared['found_artist_img']),
+                    image_checked_at=now,
+                )
+                continue
+            if artist.pk is None:
+                continue  # 本批刚新建的歌手，不需要补全
+            updated = False
+            if not artist.profile_img and prepared['found_artist_img']:
+                artist.profile_img = prepared['profile_img']
+                artist.has_image = True
+                artist.image_checked_at = now
+                updated = True
+            if not artist.biography and song_data.get('biography'):
+                artist.biography = song_data.get('biography', '')
+                updated = True
+            if not artist.source_url and song_data.get('artist_source_url'):
+                artist.source_url = song_data['artist_source_url']
+                updated = True
+            if updated:
+                updated_artists[artist.pk] = artist
+
+        # 2. 歌曲：预读本批 source_url 对应的已有歌曲
+        source_urls = {song_data['source_url'] for _, song_data, _ in rows}
+        existing = {
+            s.source_url: s
+            for s in Song.objects.filter(source_url__in=source_urls).select_related('artist')
+        }
+
+        try:
+            with transaction.atomic():
+                if new_artists:
+                    Artist.objects.bulk_create(new_artists.values(), batch_size=self.chunk_size)
+                    self._ensure_pks(new_artists)
+                    self.artists.update(new_artists)
+                if updated_artists:
+                    Artist.objects.bulk_update(updated_artists.values(), ARTIST_UPDATE_FIELDS, batch_size=self.chunk_size)
+
+                new_songs = {}
+                changed_songs = {}
+                updated_count = exist_count = 0
+                for index, song_data, prepared in rows:
+                    artist = self.artists[prepared['artist_name']]
+                    url = song_data['source_url']
+                    song = existing.get(url) or new_songs.get(url)
+                    if song is None:
+                        new_songs[url] = Song(
+                            name=song_data['name'],
+                            artist=artist,
+                            lyrics=prepared['lyrics'],
+                            cover_img=prepared['cover_img'],
+                            source_url=url,
+                            has_image=bool(prepared['found_song_img']),
+                            image_checked_at=now,
+                        )
+                        continue
+                    # 已存在（或本批前面已出现）的歌曲，只在内存中修改，稍后统一写入
+                    updated = False
+                    if song.artist.name != artist.name:
+                        song.artist = artist
+                        updated = True
+                    if song.name != song_data['name']:
+                        song.name = song_data['name']
+                        updated = True
+                    if song.lyrics != prepared['lyrics']:
+                        song.lyrics = prepared['lyrics']
+                        updated = True
+                    if not song.cover_img and prepared['found_song_img']:
+                        song.cover_img = prepared['cover_img']
+                        song.has_image = True
+                        song.image_checked_at = now
+                        updated = True
+                    if updated:
+                        updated_count += 1
+                        if song.pk is not None:
+                            changed_songs[song.pk] = song
+                    else:
+                        exist_count += 1
+
+                if new_songs:
+                    Song.objects.bulk_create(new_songs.values(), batch_size=self.chunk_size)
+                if changed_songs:
+                    Song.objects.bulk_update(changed_songs.values(), SONG_UPDATE_FIELDS, batch_size=self.chunk_size)
+
+                # bulk 操作不触发信号，手动同步 FTS 索引
+                song_pks = [s.pk for s in new_songs.values() if s.pk is not None] + list(changed_songs)
+                if len(song_pks) < len(new_songs) + len(changed_songs):
+                    song_pks = list(Song.objects.filter(source_url__in=source_urls).values_list('pk', flat=True))
+                fts.index_songs(song_pks)
+        except Exception as e:
+            # 整批回滚：本批新建的歌手也未写入；已有歌手在内存中的补全同样作废，按数据库中的状态重新读取
+            for name in new_artists:
+                self.artists.pop(name, None)
+            self.artist_source_urls.difference_update(a.source_url for a in new_artists.values())
+            for artist in Artist.objects.filter(pk__in=list(updated_artists)):
+                self.artists[artist.name] = artist
+            for index, song_data, _ in rows:
+                self._error(index, song_data, f"批量写入失败: {e}")
+            return
+
+        self.stats['artists_created'] += len(new_artists)
+        self.stats['artists_updated'] += len(updated_artists)
+        self.stats['songs_added'] += len(new_songs)
+        self.stats['songs_updated'] += updated_count
+        self.stats['songs_exist'] += exist_count
+
+    def _ensure_pks(self, new_artists):  # 数据库不支持 RETURNING 时按名称回查主键
+        missing = [name for name, a in new_artists.items() if a.pk is None]
+        if missing:
+            for artist in Artist.objects.filter(name__in=missing).order_by('-id'):
+                new_artists[artist.name] = artist
+
+
+def import_songs(json_file_path=None, artist_json_path=None, chunk_size=None, progress=None):
+    """
+    从 songs.json（及 artists.json 别名表）批量导入，完成后重建搜索索引；
+    返回 (stats, errors, index_sizes)
+    """
+    json_file_path = json_file_path or os.path.join(settings.BASE_DIR, 'output', 'songs.json')
+    artist_json_path = artist_json_path or os.path.join(settings.BASE_DIR, 'output', 'artists.json')
+    importer = SongImporter(load_artist_aliases(artist_json_path), chunk_size=chunk_size)
+    stats = importer.run(read_song_records(json_file_path), progress=progress)
+    index_sizes = search_engine.rebuild_all()
+    return stats, importer.errors, index_sizes
@@ -0,0 +1,111 @@
+"""
+后台导入任务
+/add_songs/ 只创建 ImportJob 并把导入交给进程内线程池执行，请求立即返回；
+导入过程中按批把进度写回 ImportJob，页面轮询状态接口显示进度；
+另有心跳线程在整个任务期间（包括导入后重建搜索索引）定时刷新 heartbeat_at。
+"""
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from . import importer
+from .models import ImportJob
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "IMPORT_JOB_WORKERS", 1),
+                    thread_name_prefix="import-job",
+                )
+    return _executor
+
+
+def active_job():  # 返回未结束的任务；心跳超时的（进程已退出）标记为失败
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, "IMPORT_JOB_STALE_SECONDS", 600))
+    for job in ImportJob.objects.filter(status__in=["pending", "running"]).order_by("-id"):
+        last_seen = job.heartbeat_at or job.created_at
+        if last_seen >= stale_before:
+            return job
+        job.status = "failed"
+        job.message = "任务长时间没有进度，所在进程可能已退出"
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "message", "finished_at"])
+    return None
+
+
+def start_import(json_file_path=None, chunk_size=None):  # 创建任务并提交到线程池，已有任务在运行时直接返回它
+    with _executor_lock:
+        job = active_job()
+        if job is not None:
+            return job
+        job = ImportJob.objects.create(chunk_size=chunk_size or settings.IMPORT_CHUNK_SIZE)
+    json_file_path = json_file_path or os.path.join(settings.BASE_DIR, 'output', 'songs.json')
+    _get_executor().submit(_run, job.pk, json_file_path)
+    return job
+
+
+def _heartbeat(job_id, stop, interval):  # 在独立线程中定时刷新心跳，大批次和重建索引期间任务也不会被判为中断
+    try:
+        while not stop.wait(interval):
+            ImportJob.objects.filter(pk=job_id, status="running").update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def _run(job_id, json_file_path):
+    close_old_connections()
+    stop = threading.Event()
+    interval = getattr(settings, "IMPORT_JOB_STALE_SECONDS", 600) / 4
+    try:
+        now = timezone.now()
+        ImportJob.objects.filter(pk=job_id).update(status="running", started_at=now, heartbeat_at=now)
+        threading.Thread(
+            target=_heartbeat, args=(job_id, stop, interval), name=f"import-job-{job_id}-heartbeat", daemon=True
+        ).start()
+
+        def progress(processed, stats):
+            ImportJob.objects.filter(pk=job_id).update(
+                processed=processed,
+                created=stats['songs_added'],
+                updated=stats['songs_updated'],
+                errors=stats['songs_error'],
+                heartbeat_at=timezone.now(),
+            )
+
+        job = ImportJob.objects.get(pk=job_id)
+        stats, error_details, index_sizes = importer.import_songs(
+            json_file_path, chunk_size=job.chunk_size, progress=progress
+        )
+        ImportJob.objects.filter(pk=job_id).update(
+            status="done",
+            created=stats['songs_added'],
+            updated=stats['songs_updated'],
+            errors=stats['songs_error'],
+            stats={**stats, 'index_sizes': index_sizes},
+            error_details=error_details[:100],  # 只保留前100条错误
+            message="导入完成",
+            finished_at=timezone.now(),
+        )
+    except Exception as e:
+        traceback.print_exc()
+        ImportJob.objects.filter(pk=job_id).update(
+            status="failed",
+            message=f"导入失败：{e}",
+            finished_at=timezone.now(),
+        )
+    finally:
+        stop.set()
+        connection.close()  # 线程结束前释放本线程的数据库连接
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from music import fts, search_engine
+
+
+class Command(BaseCommand):
+    help = '从 Song/Artist 表全量重建搜索索引（SQLite FTS5、jieba 倒排索引与 n-gram 子串索引）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='FTS 每批写入的行数')
+        parser.add_argument(
+            '--only',
+            choices=['fts', 'engine'],
+            help='只重建指定的索引，默认全部重建',
+        )
+
+    def handle(self, *args, **options):
+        only = options['only']
+        if only in (None, 'fts'):
+            t0 = time.perf_counter()
+            total = fts.rebuild(batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - t0
+            self.stdout.write(self.style.SUCCESS(f"FTS 索引重建完成：{total} 首歌曲，耗时 {elapsed:.2f} 秒"))
+        if only in (None, 'engine'):
+            t0 = time.perf_counter()
+            sizes = search_engine.rebuild_all()
+            elapsed = time.perf_counter() - t0
+            self.stdout.write(self.style.SUCCESS(
+                f"jieba/n-gram 索引重建完成：歌曲 {sizes['song']} 篇，歌手 {sizes['artist']} 篇，"
+                f"子串 {sizes['ngram']} 篇，耗时 {elapsed:.2f} 秒"
+            ))
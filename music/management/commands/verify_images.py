@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from music.media_index import MediaIndex
+from music.models import Artist, Song
+
+
+class Command(BaseCommand):
+    help = '批量扫描 MEDIA_ROOT，更新 Artist/Song 的 has_image 与 image_checked_at 字段'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批更新的记录数')
+        parser.add_argument(
+            '--only-unchecked',
+            action='store_true',
+            help='只检查 image_checked_at 为空的记录',
+        )
+
+    def handle(self, *args, **options):
+        index = MediaIndex(settings.MEDIA_ROOT)
+        index.refresh(force=True)  # 整个命令只扫描一次目录
+        self.stdout.write(f"媒体目录 {settings.MEDIA_ROOT} 中共有 {len(index)} 个图片文件")
+
+        checked_at = timezone.now()
+        for model, field in ((Artist, 'profile_img'), (Song, 'cover_img')):
+            qs = model.objects.only('id', field, 'has_image', 'image_checked_at').order_by('id')
+            if options['only_unchecked']:
+                qs = qs.filter(image_checked_at__isnull=True)
+            batch = []
+            total = found = 0
+            for obj in qs.iterator(chunk_size=options['batch_size']):
+                name = getattr(obj, field).name
+                obj.has_image = bool(name) and index.exists(name)
+                obj.image_checked_at = checked_at
+                batch.append(obj)
+                total += 1
+                found += obj.has_image
+                if len(batch) >= options['batch_size']:
+                    self._flush(model, batch)
+                    batch = []
+            if batch:
+                self._flush(model, batch)
+            self.stdout.write(f"{model.__name__}: 检查 {total} 条，图片存在 {found} 条，缺失 {total - found} 条")
+
+        self.stdout.write(self.style.SUCCESS("图片检查完成！"))
+
+    def _flush(self, model, batch):
+        with transaction.atomic():
+            model.objects.bulk_update(batch, ['has_image', 'image_checked_at'])
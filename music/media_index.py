@@ -0,0 +1,85 @@
+"""
+媒体文件存在性索引
+一次性扫描 MEDIA_ROOT 下的 artist_images 和 song_images（含子目录），
+把已有文件的相对路径放进集合；之后按轮询间隔检查各目录 mtime，有变化才重新扫描。
+safe_media_url 判断图片是否存在只需一次集合查询，不再每张图 stat 一次。
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+
+IMAGE_DIRS = ("artist_images", "song_images")
+
+
+class MediaIndex:
+    def __init__(self, root, subdirs=IMAGE_DIRS, poll_interval=5.0):
+        self.root = str(root)
+        self.subdirs = subdirs
+        self.poll_interval = poll_interval
+        self._files = frozenset()
+        self._dir_mtimes = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _scan(self):  # 遍历图片目录，返回 (文件相对路径集合, {目录: mtime})
+        files = set()
+        mtimes = {}
+        for subdir in self.subdirs:
+            top = os.path.join(self.root, subdir)
+            for dirpath, _dirnames, filenames in os.walk(top):
+                try:
+                    mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+                except OSError:
+                    continue
+                rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+                files.update(f"{rel_dir}/{name}" for name in filenames)
+            if top not in mtimes:
+                mtimes[top] = None  # 目录尚不存在，创建后 mtime 变化会触发重扫
+        return frozenset(files), mtimes
+
+    def _changed(self):
+        for dirpath, mtime in self._dir_mtimes.items():
+            try:
+                current = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                return True
+        return False
+
+    def refresh(self, force=False):  # 超过轮询间隔且目录有变化时重新扫描
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.poll_interval:
+            return
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.poll_interval:
+                return
+            if force or self._checked_at is None or self._changed():
+                self._files, self._dir_mtimes = self._scan()
+            self._checked_at = time.monotonic()
+
+    def exists(self, name):  # name 是相对 MEDIA_ROOT 的路径，如 "song_images/xxx.jpg"
+        self.refresh()
+        return name.replace("\\", "/").lstrip("/") in self._files
+
+    def __len__(self):
+        self.refresh()
+        return len(self._files)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_media_index():  # 进程内共享的单例，首次使用时构建
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MediaIndex(
+                    settings.MEDIA_ROOT,
+                    poll_interval=getattr(settings, "MEDIA_INDEX_POLL_INTERVAL", 5.0),
+                )
+    return _index
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from music import fts
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    fts.create_table(schema_editor)
+    schema_editor.execute(
+        f"INSERT INTO {fts.FTS_TABLE}(rowid, name, lyrics, artist_name) "
+        "SELECT s.id, s.name, s.lyrics, a.name FROM music_song s "
+        "JOIN music_artist a ON a.id = s.artist_id"
+    )
+
+
+def drop_fts(apps, schema_editor):
+    fts.drop_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0002_alter_artist_profile_img_alter_song_cover_img'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0003_song_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='has_image',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='image_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='has_image',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='image_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
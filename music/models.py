@@ -26,6 +26,8 @@ class Artist(models.Model):
     biography = models.TextField(blank=True)
     profile_img = models.ImageField(upload_to=artist_profile_path, blank=True)
     source_url = models.URLField(unique=True)
+    has_image = models.BooleanField(default=False, db_index=True)   # 头像文件是否存在，由 verify_images 命令维护
+    image_checked_at = models.DateTimeField(null=True, blank=True)  # 上次检查时间，为空表示未检查
 
     def __str__(self):
         return self.name
@@ -36,6 +38,8 @@ class Song(models.Model):
     lyrics = models.TextField(blank=True)
     cover_img = models.ImageField(upload_to=song_cover_path, blank=True)
     source_url = models.URLField(unique=True)
+    has_image = models.BooleanField(default=False, db_index=True)   # 封面文件是否存在，由 verify_images 命令维护
+    image_checked_at = models.DateTimeField(null=True, blank=True)  # 上次检查时间，为空表示未检查
 
     def __str__(self):
         return f"{self.name} - {self.artist.name}"
@@ -43,4 +47,43 @@ class Song(models.Model):
 class Comment(models.Model):
     song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name="comments")
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class ImportJob(models.Model):
+    """后台导入任务，记录 songs.json 导入进度供页面轮询"""
+    STATUS_CHOICES = [
+        ("pending", "等待中"),
+        ("running", "导入中"),
+        ("done", "已完成"),
+        ("failed", "失败"),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    chunk_size = models.PositiveIntegerField(default=500)
+    processed = models.PositiveIntegerField(default=0)    # 已处理的记录数
+    created = models.PositiveIntegerField(default=0)      # 新增歌曲数
+    updated = models.PositiveIntegerField(default=0)      # 更新歌曲数
+    errors = models.PositiveIntegerField(default=0)       # 失败记录数
+    stats = models.JSONField(default=dict, blank=True)    # 完成后的完整统计（含歌手、索引）
+    error_details = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # 任务运行期间定时刷新，用于识别中断的任务
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"ImportJob #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ("done", "failed")
+
+class IndexChange(models.Model):
+    """磁盘搜索索引（jieba 倒排 / n-gram）建好之后变更过的对象，由信号写入，重建对应索引时清除"""
+    kind = models.CharField(max_length=10)         # 索引类型：song / artist / ngram
+    object_id = models.BigIntegerField()            # 新增、修改或删除的 Song/Artist 主键
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("kind", "object_id")
@@ -0,0 +1,137 @@
+"""
+字符 n-gram 索引，用于歌词/歌名的任意子串搜索
+对 Song.name 与 Song.lyrics 建立单字、二字（bigram）和三字（trigram）倒排表，查询时求交集得到候选歌曲，
+再只对候选行做一次 icontains 校验，结果与全表 icontains 完全一致。
+索引只在导入后重建，之间单条保存/删除的歌曲由信号记入 IndexChange，查询时并入候选一起校验。
+"""
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db.models import Q
+
+# SQLite 的 LIKE 只对 ASCII 字母大小写不敏感，这里保持同样的语义
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+VERIFY_CHUNK = 500  # 每次校验的候选主键数，避免超过 SQLite 参数上限
+MAX_CANDIDATE_RATIO = 0.3  # 候选超过总量的该比例时，直接扫表反而更快
+MIN_QUERY_LEN = 3  # 单字、二字查询的候选太多，求交集不比扫表快（见 misc/bench_ngram_search.py），直接扫表
+
+
+def fold(text):
+    return text.translate(_ASCII_LOWER)
+
+
+GRAM_SIZE = 3  # 最长片段长度
+
+
+def grams(text):  # 返回文本中所有长度 1..GRAM_SIZE 的片段
+    text = fold(text)
+    result = set(text)
+    for n in range(2, GRAM_SIZE + 1):
+        result.update(text[i:i + n] for i in range(len(text) - n + 1))
+    return result
+
+
+def query_grams(q):  # 查询用到的片段：取不超过 GRAM_SIZE 的最长片段覆盖整个查询
+    q = fold(q)
+    n = min(len(q), GRAM_SIZE)
+    return {q[i:i + n] for i in range(len(q) - n + 1)}
+
+
+class NgramIndex:
+    """
+    n-gram 倒排索引：片段 -> 升序文档号数组，文档号是 doc_ids 中的下标
+    """
+
+    def __init__(self):
+        self.doc_ids = array("q")
+        self.postings = {}
+        self.max_pk = 0
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, docs):  # docs: 可迭代的 (主键, 歌名, 歌词)
+        index = cls()
+        buffers = defaultdict(lambda: array("I"))
+        for pk, name, lyrics in docs:
+            doc_no = len(index.doc_ids)
+            index.doc_ids.append(pk)
+            index.max_pk = max(index.max_pk, pk)
+            for gram in grams(name) | grams(lyrics):
+                buffers[gram].append(doc_no)
+        index.postings = dict(buffers)
+        return index
+
+    def candidates(self, q):  # 返回可能包含 q 的主键集合（超集），需再校验
+        lists = []
+        for gram in query_grams(q):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return set()
+            lists.append(posting)
+        lists.sort(key=len)
+        result = list(lists[0])
+        for posting in lists[1:]:
+            if not result:
+                break
+            if len(result) * 16 < len(posting):  # 候选远少于倒排表时逐个二分查找
+                result = [d for d in result if _contains(posting, d)]
+            else:
+                result = sorted(set(result).intersection(posting))
+        return {self.doc_ids[d] for d in result}
+
+
+def _contains(posting, doc_no):  # 倒排表升序，二分判断是否包含
+    i = bisect_left(posting, doc_no)
+    return i < len(posting) and posting[i] == doc_no
+
+
+def build():  # 从数据库重建 n-gram 索引并写入磁盘，返回文档数
+    from django.utils import timezone
+    from . import search_engine
+    from .models import IndexChange, Song
+    started = timezone.now()
+    qs = Song.objects.only("id", "name", "lyrics").order_by("id")
+    index = NgramIndex.build(
+        (song.id, song.name, song.lyrics) for song in qs.iterator(chunk_size=2000)
+    )
+    search_engine.save_index("ngram", index)
+    IndexChange.objects.filter(kind="ngram", changed_at__lt=started).delete()
+    return len(index)
+
+
+def _scan(text_match, q):  # 不用索引，整表 icontains
+    from .models import Song
+    return sorted(Song.objects.filter(text_match | Q(artist__name__icontains=q)).values_list("pk", flat=True))
+
+
+def search_song_ids(q):
+    """
+    返回与 name/lyrics/artist__name icontains 完全相同的歌曲主键（升序）；
+    索引未建立时返回 None
+    """
+    from . import search_engine
+    from .models import IndexChange, Song
+    index = search_engine.get_index("ngram")
+    if index is None or not q:
+        return None
+    text_match = Q(name__icontains=q) | Q(lyrics__icontains=q)
+    if len(q) < MIN_QUERY_LEN:
+        return _scan(text_match, q)
+    # 建索引之后保存过的歌曲（信号记入 IndexChange）索引内容可能过时，一律作为候选交给 icontains 校验
+    candidates = index.candidates(q)
+    candidates.update(IndexChange.objects.filter(kind="ngram").values_list("object_id", flat=True))
+    if len(candidates) > MAX_CANDIDATE_RATIO * max(len(index), 1):
+        return _scan(text_match, q)
+
+    hits = set()
+    candidates = sorted(candidates)
+    for i in range(0, len(candidates), VERIFY_CHUNK):
+        chunk = candidates[i:i + VERIFY_CHUNK]
+        hits.update(Song.objects.filter(pk__in=chunk).filter(text_match).values_list("pk", flat=True))
+    # 歌手名匹配走 Artist 表；建索引之后新增的歌曲（如 bulk_create）单独扫尾
+    hits.update(Song.objects.filter(artist__name__icontains=q).values_list("pk", flat=True))
+    hits.update(Song.objects.filter(pk__gt=index.max_pk).filter(text_match).values_list("pk", flat=True))
+    return sorted(hits)
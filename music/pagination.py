@@ -0,0 +1,135 @@
+"""
+分页工具：游标（keyset）分页与使用缓存总数的页码分页器
+按 (id) 或 (name, id) 等唯一排序键用 WHERE 条件定位下一页，不做 COUNT(*) 和 OFFSET，
+任意深度的翻页开销与第一页相同。游标是排序键取值的 base64 编码，对前端不透明。
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def encode_cursor(direction, values):  # direction: "n" 向后翻页 / "p" 向前翻页
+    raw = json.dumps([direction, list(values)], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, n_fields):  # 解析失败时返回 None，视为第一页
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if direction not in ("n", "p") or not isinstance(values, list) or len(values) != n_fields:
+        return None
+    if not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    return direction, values
+
+
+def _cursor_values(model, fields, values):  # 按字段类型转换游标中的取值，类型不符时返回 None
+    try:
+        return [model._meta.get_field(f).to_python(v) for f, v in zip(fields, values)]
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+
+def _seek(fields, values, op):  # 构造 (f1, f2, ...) > / < (v1, v2, ...) 的行比较条件
+    condition = Q()
+    for i, (field, value) in enumerate(zip(fields, values)):
+        step = Q(**{f"{field}__{op}": value})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            step &= Q(**{prev_field: prev_value})
+        condition |= step
+    return condition
+
+
+class KeysetPage:
+    """
+    与 Django Page 用法相近的游标分页结果，模板通过 is_keyset 区分两种分页
+    """
+    is_keyset = True
+    paginator = None
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.next_query = ""
+        self.prev_query = ""
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+def keyset_paginate(queryset, fields, cursor, per_page=20):
+    """
+    按 fields（末尾必须是唯一字段，如 id）排序后取游标所在的一页
+    """
+    fields = list(fields)
+    decoded = decode_cursor(cursor, len(fields))
+    direction, values = decoded if decoded else ("n", None)
+    if values is not None:
+        values = _cursor_values(queryset.model, fields, values)
+        if values is None:
+            direction = "n"
+
+    if direction == "n":
+        qs = queryset.order_by(*fields)
+        if values is not None:
+            qs = qs.filter(_seek(fields, values, "gt"))
+        rows = list(qs[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = values is not None
+    else:
+        qs = queryset.order_by(*[f"-{f}" for f in fields]).filter(_seek(fields, values, "lt"))
+        rows = list(qs[:per_page + 1])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+
+    def key(obj):
+        return [getattr(obj, f) for f in fields]
+
+    return KeysetPage(
+        rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=encode_cursor("n", key(rows[-1])) if has_next and rows else None,
+        prev_cursor=encode_cursor("p", key(rows[0])) if has_previous and rows else None,
+    )
+
+
+class CachedCountPaginator(Paginator):
+    """
+    使用外部提供的总数（见 counts.py），避免每次请求都执行 COUNT(*)
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
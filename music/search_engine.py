@@ -0,0 +1,249 @@
+"""
+基于 jieba 分词的倒排索引搜索引擎
+导入数据时对 Song.name/lyrics、Artist.name/biography 分词，
+生成紧凑的倒排表（array 存储的文档号 + 词频），search() 用 BM25 排序检索。
+索引文件只在导入后重建；之间单条保存/删除的对象由信号记入 IndexChange，
+搜索时索引中这些文档的旧内容不计分，改为按数据库中的当前内容现场打分。
+"""
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+K1 = 1.2
+B = 0.75
+NAME_BOOST = 3  # 名称字段的词频权重，名称命中比歌词/简介命中更相关
+MAX_CHANGED = 2000  # 建索引之后变更的文档超过该数量时不再现场补偿，回退到 FTS/LIKE
+
+_TOKEN_RE = re.compile(r"\w", re.UNICODE)
+_indexes = {}  # kind -> (mtime, InvertedIndex)，进程内缓存
+_lock = threading.Lock()
+
+
+def tokenize(text):  # 搜索引擎模式分词，统一小写并去掉纯标点/空白
+    import jieba  # 延迟导入，避免 Web 进程启动时加载词典
+    if not text:
+        return []
+    return [t.lower() for t in jieba.cut_for_search(text) if _TOKEN_RE.search(t)]
+
+
+def doc_terms(name, body):  # 一篇文档的词频，名称中的词按 NAME_BOOST 加权
+    tf = Counter(tokenize(body))
+    for term in tokenize(name):
+        tf[term] += NAME_BOOST
+    return tf
+
+
+class InvertedIndex:
+    """
+    倒排索引：每个词对应 (文档号数组, 词频数组)，文档号是 doc_ids 中的下标，
+    doc_ids 再映射回数据库主键
+    """
+    max_pk = 0  # 旧索引文件没有记录，视为全部文档都在建索引之后变更过
+
+    def __init__(self):
+        self.doc_ids = array("q")
+        self.doc_lens = array("I")
+        self.postings = {}
+        self.avgdl = 0.0
+        self.max_pk = 0
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, docs):  # docs: 可迭代的 (主键, 名称, 正文)
+        index = cls()
+        buffers = defaultdict(lambda: (array("I"), array("I")))
+        total_len = 0
+        for pk, name, body in docs:
+            tf = doc_terms(name, body)
+            doc_no = len(index.doc_ids)
+            index.doc_ids.append(pk)
+            index.max_pk = max(index.max_pk, pk)
+            length = sum(tf.values())
+            index.doc_lens.append(length)
+            total_len += length
+            for term, freq in tf.items():
+                nos, freqs = buffers[term]
+                nos.append(doc_no)
+                freqs.append(freq)
+        index.postings = dict(buffers)
+        index.avgdl = total_len / len(index.doc_ids) if index.doc_ids else 0.0
+        return index
+
+    def _idf(self, df):
+        n = len(self.doc_ids)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _weight(self, tf, doc_len):
+        norm = K1 * (1 - B + B * doc_len / (self.avgdl or 1.0))
+        return tf * (K1 + 1) / (tf + norm)
+
+    def search(self, q, limit=None, changed=(), changed_docs=()):
+        """
+        返回按 BM25 分数降序的主键列表。changed 为建索引之后变更过的主键，索引里它们的旧内容不再计分；
+        changed_docs 为其中仍存在的文档 (主键, 名称, 正文)，按当前内容用索引的统计量现场打分。
+        查询无有效词、或没有任何词出现在索引和变更文档中时返回 None，由调用方回退
+        """
+        terms = set(tokenize(q))
+        if not terms:
+            return None
+        matched = False
+        scores = defaultdict(float)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            matched = True
+            nos, freqs = posting
+            idf = self._idf(len(nos))
+            for doc_no, tf in zip(nos, freqs):
+                scores[doc_no] += idf * self._weight(tf, self.doc_lens[doc_no])
+        ranked = [(-score, self.doc_ids[d]) for d, score in scores.items()]
+        if changed:
+            ranked = [item for item in ranked if item[1] not in changed]
+        for pk, name, body in changed_docs:
+            tf = doc_terms(name, body)
+            hits = terms & tf.keys()
+            if not hits:
+                continue
+            matched = True
+            length = sum(tf.values())
+            score = sum(
+                self._idf(len(self.postings[t][0]) if t in self.postings else 0) * self._weight(tf[t], length)
+                for t in hits
+            )
+            ranked.append((-score, pk))
+        if not matched:
+            return None
+        ranked.sort()
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [pk for _, pk in ranked]
+
+
+def index_path(kind):
+    return os.path.join(settings.SEARCH_INDEX_DIR, f"{kind}.idx")
+
+
+def _iter_docs(kind, pks=None):  # pks 不为 None 时只读取这些主键（已删除的自然跳过）
+    from .models import Artist, Song
+    if kind == "song":
+        qs = Song.objects.select_related("artist").only("id", "name", "lyrics", "artist__name")
+        if pks is not None:
+            qs = qs.filter(pk__in=pks)
+        for song in qs.iterator(chunk_size=2000):
+            yield song.id, song.name, f"{song.lyrics}\n{song.artist.name}"
+    elif kind == "artist":
+        qs = Artist.objects.only("id", "name", "biography")
+        if pks is not None:
+            qs = qs.filter(pk__in=pks)
+        for artist in qs.iterator(chunk_size=2000):
+            yield artist.id, artist.name, artist.biography
+    else:
+        raise ValueError(f"未知的索引类型: {kind}")
+
+
+def mark_changed(kinds, pks):  # 信号调用：记录变更过的主键，搜索时对这些文档做补偿；已有的记录只更新时间，一条语句写完
+    from .models import IndexChange
+    now = timezone.now()
+    pks = list(pks)
+    IndexChange.objects.bulk_create(
+        [IndexChange(kind=kind, object_id=pk, changed_at=now) for kind in kinds for pk in pks],
+        update_conflicts=True, unique_fields=["kind", "object_id"], update_fields=["changed_at"],
+    )
+
+
+def changed_ids(kind, index, model):
+    """
+    建索引之后变更过的主键：信号记录的变更，加上 max_pk 之后新增的行（bulk_create 不触发信号）。
+    超过 MAX_CHANGED 个时返回 None，此时现场补偿不划算，应重建索引
+    """
+    from .models import IndexChange
+    pks = set(IndexChange.objects.filter(kind=kind).values_list("object_id", flat=True)[:MAX_CHANGED + 1])
+    pks.update(model.objects.filter(pk__gt=index.max_pk).values_list("pk", flat=True)[:MAX_CHANGED + 1])
+    return pks if len(pks) <= MAX_CHANGED else None
+
+
+def _clear_changes(kind, built_from):  # 索引已包含 built_from 之前的全部变更
+    from .models import IndexChange
+    IndexChange.objects.filter(kind=kind, changed_at__lt=built_from).delete()
+
+
+def save_index(kind, index):  # 先写临时文件再原子替换，读进程不会读到半个文件
+    os.makedirs(settings.SEARCH_INDEX_DIR, exist_ok=True)
+    path = index_path(kind)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def build(kind):  # 从数据库重建指定类型的索引并写入磁盘，返回文档数
+    started = timezone.now()
+    index = InvertedIndex.build(_iter_docs(kind))
+    save_index(kind, index)
+    _clear_changes(kind, started)
+    return len(index)
+
+
+def rebuild_all():  # 重建全部磁盘索引（BM25 歌曲/歌手索引与 n-gram 子串索引）
+    from . import ngram_index
+    sizes = {kind: build(kind) for kind in ("song", "artist")}
+    sizes["ngram"] = ngram_index.build()
+    return sizes
+
+
+def get_index(kind):  # 读取磁盘索引，文件更新后自动重新加载；未建索引时返回 None
+    path = index_path(kind)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cached = _indexes.get(kind)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _lock:
+        cached = _indexes.get(kind)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        _indexes[kind] = (mtime, index)
+        return index
+
+
+def _search(kind, q, limit):
+    from .models import Artist, Song
+    index = get_index(kind)
+    if index is None or not len(index):
+        return None
+    changed = changed_ids(kind, index, Song if kind == "song" else Artist)
+    if changed is None:
+        return None
+    changed_docs = _iter_docs(kind, changed) if changed else ()
+    return index.search(q, limit, changed=changed, changed_docs=changed_docs)
+
+
+def search(kind, q, limit=None):
+    """
+    返回排序后的主键列表；索引不可用、建索引之后变更过多或查询词都不在索引中时返回 None 以便回退
+    """
+    if limit is None:
+        limit = getattr(settings, "SEARCH_RESULT_LIMIT", 1000)
+    return _search(kind, q, limit)
+
+
+def rank(kind, q, ids):  # 按 BM25 分数对给定主键排序，BM25 未命中的保持原顺序排在后面
+    ranked = _search(kind, q, None)
+    if not ranked:
+        return ids
+    pos = {pk: i for i, pk in enumerate(ranked)}
+    return sorted(ids, key=lambda pk: pos.get(pk, len(pos)))
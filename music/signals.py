@@ -0,0 +1,68 @@
+"""
+模型信号：Song / Artist 写入后同步搜索索引；图片路径被修改时作废 verify_images 的检查结果
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counts, fts, search_engine
+from .models import Artist, Song
+
+
+IMAGE_FIELDS = {Song: "cover_img", Artist: "profile_img"}
+
+
+@receiver(pre_save, sender=Song)
+@receiver(pre_save, sender=Artist)
+def image_path_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    fix_* 命令、clean_db 等修改图片路径后，原来的 has_image 不再可信：清空 image_checked_at，
+    模板改用媒体文件索引判断，下次 verify_images（可加 --only-unchecked）再写入新的结果
+    """
+    field = IMAGE_FIELDS[sender]
+    if instance.pk is None or instance.image_checked_at is None:
+        return
+    if update_fields is not None and field not in update_fields:
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    if old != getattr(instance, field).name:
+        instance.image_checked_at = None
+
+
+@receiver(pre_save, sender=Artist)
+def artist_name_changed(sender, instance, update_fields=None, **kwargs):
+    """记下改名前的名字：歌曲的索引文档包含歌手名，只有改名时才需要重建该歌手全部歌曲的索引"""
+    instance._old_name = None
+    if instance.pk is None or (update_fields is not None and "name" not in update_fields):
+        return
+    instance._old_name = sender.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+
+
+@receiver(post_save, sender=Song)
+def song_saved(sender, instance, created, **kwargs):
+    fts.index_songs([instance.pk])
+    search_engine.mark_changed(["song", "ngram"], [instance.pk])
+    if created:
+        counts.adjust(Song, 1)
+
+
+@receiver(post_delete, sender=Song)
+def song_deleted(sender, instance, **kwargs):
+    fts.remove_songs([instance.pk])
+    search_engine.mark_changed(["song", "ngram"], [instance.pk])
+    counts.adjust(Song, -1)
+
+
+@receiver(post_save, sender=Artist)
+def artist_saved(sender, instance, created, **kwargs):
+    search_engine.mark_changed(["artist"], [instance.pk])
+    if created:
+        counts.adjust(Artist, 1)
+    elif getattr(instance, "_old_name", None) not in (None, instance.name):  # 新歌手还没有歌曲，已有歌手改名才需要同步
+        fts.index_artist_songs(instance.pk)
+        search_engine.mark_changed(["song"], instance.songs.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Artist)
+def artist_deleted(sender, instance, **kwargs):
+    search_engine.mark_changed(["artist"], [instance.pk])
+    counts.adjust(Artist, -1)
@@ -1,38 +1,37 @@
-import os
 from django import template
 from django.conf import settings
 
+from music.media_index import get_media_index
+
 register = template.Library()
 
+PLACEHOLDER = '/static/placeholder.png'
+
+
 @register.filter
 def safe_media_url(image_field):
     """
     安全地获取图片URL，处理空值情况和文件不存在的情况
+    模型上已有 verify_images 的检查结果时直接使用 has_image，
+    否则通过进程内的媒体文件索引判断，都不访问文件系统
     """
     if not image_field:
-        return '/static/placeholder.png'
-    
+        return PLACEHOLDER
+
     # 如果是字符串路径，直接使用
     if isinstance(image_field, str):
-        if image_field.strip():
-            # 检查文件是否真实存在
-            file_path = os.path.join(settings.MEDIA_ROOT, image_field)
-            if os.path.exists(file_path):
-                return f"{settings.MEDIA_URL}{image_field}"
-            else:
-                print(f"图片文件不存在: {file_path}")
-                return '/static/placeholder.png'
-        else:
-            return '/static/placeholder.png'
-    
+        name = image_field.strip()
+        if name and get_media_index().exists(name):
+            return f"{settings.MEDIA_URL}{name}"
+        return PLACEHOLDER
+
     # 如果是ImageField对象
     if hasattr(image_field, 'name') and image_field.name:
-        # 检查文件是否真实存在
-        file_path = os.path.join(settings.MEDIA_ROOT, image_field.name)
-        if os.path.exists(file_path):
+        instance = getattr(image_field, 'instance', None)
+        if getattr(instance, 'image_checked_at', None) is not None:
+            return image_field.url if instance.has_image else PLACEHOLDER
+        if get_media_index().exists(image_field.name):
             return image_field.url
-        else:
-            print(f"图片文件不存在: {file_path}")
-            return '/static/placeholder.png'
-    
-    return '/static/placeholder.png'
\ No newline at end of file
+        return PLACEHOLDER
+
+    return PLACEHOLDER
@@ -14,4 +14,6 @@ urlpatterns = [
 
     path("search/", views.search, name="search"),      # 搜索结果页
     path("add_songs/", views.add_songs_from_json, name="add_songs"),
+    path("add_songs/jobs/<int:pk>/", views.import_job_detail, name="import_job_detail"),      # 导入任务进度页
+    path("add_songs/jobs/<int:pk>/status/", views.import_job_status, name="import_job_status"),   # 导入任务状态接口
 ]
\ No newline at end of file
@@ -51,6 +51,7 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 # 媒体文件配置 - 关键修改
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "output"
+MEDIA_INDEX_POLL_INTERVAL = 5  # 媒体文件索引检查目录变化的间隔（秒）
 
 # 文件上传设置
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -60,4 +61,13 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 20 * 1024 * 1024  # 20MB
 TIME_ZONE = 'Asia/Shanghai'
 USE_TZ = True
 
-DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
\ No newline at end of file
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+# 搜索设置
+SEARCH_RESULT_LIMIT = 1000  # 全文索引单次最多返回的结果数
+SEARCH_INDEX_DIR = BASE_DIR / "search_index"  # jieba 倒排索引文件目录
+COUNT_CACHE_TTL = 300  # 分页总数（全表与搜索结果）的缓存秒数
+
+# 数据导入设置
+IMPORT_CHUNK_SIZE = 500  # add_songs 每批 bulk_create/bulk_update 的歌曲数
+IMPORT_JOB_WORKERS = 1  # 后台导入线程数
+IMPORT_JOB_STALE_SECONDS = 600  # 任务超过该秒数没有心跳即视为中断（心跳每 1/4 该时长刷新一次）
@@ -7,7 +7,6 @@ import json
 import re
 import django
 from pathlib import Path
-import string
 
 # 设置Django环境
 BASE_DIR = Path(__file__).resolve().parent
@@ -15,36 +14,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'musicbrowser.settings')
 django.setup()
 
 from music.models import Song, Artist
+from music import search_engine
+from music.image_catalog import ImageCatalog
 from django.conf import settings
-
-def find_file_case_insensitive(directory, filename):
-    if not os.path.exists(directory):
-        return None
-    filename_lower = filename.lower()
-    for file in os.listdir(directory):
-        if file.lower() == filename_lower:
-            return file
-    return None
-
-def normalize_name(name):
-    # 小写，去除空格、下划线、连字符、标点
-    name = name.lower()
-    name = name.replace(' ', '').replace('_', '').replace('-', '')
-    name = ''.join(c for c in name if c not in string.punctuation)
-    return name
-
-def fuzzy_find_file(directory, artist_name):
-    if not os.path.exists(directory):
-        return None
-    norm_artist = normalize_name(artist_name)
-    for file in os.listdir(directory):
-        if not file.lower().endswith('.jpg'):
-            continue
-        norm_file = normalize_name(os.path.splitext(file)[0])
-        # 只要 artist 名在文件名里，或文件名在 artist 名里
-        if norm_artist in norm_file or norm_file in norm_artist:
-            return file
-    return None
+from django.utils import timezone
 
 def get_main_artist(artist_name):
     # 分割所有候选名
@@ -108,6 +81,9 @@ def reset_and_import():
     artists_created_count = 0
     error_details = []
     artist_cache = {}
+    # 图片目录只列一次，之后按名称查表
+    artist_images = ImageCatalog(os.path.join(settings.MEDIA_ROOT, "artist_images"))
+    song_images = ImageCatalog(os.path.join(settings.MEDIA_ROOT, "song_images"))
 
     for i, song_data in enumerate(data):
         try:
@@ -124,11 +100,9 @@ def reset_and_import():
             safe_song_name = safe_filename(song_data['name'])
             expected_artist_img = f"{safe_artist_name}.jpg"
             expected_song_img = f"{safe_song_name}.jpg"
-            artist_img_dir = os.path.join(settings.MEDIA_ROOT, "artist_images")
-            song_img_dir = os.path.join(settings.MEDIA_ROOT, "song_images")
             # 用 fuzzy 匹配 artist 图片
-            found_artist_img = fuzzy_find_file(artist_img_dir, main_artist_name)
-            found_song_img = find_file_case_insensitive(song_img_dir, expected_song_img)
+            found_artist_img = artist_images.fuzzy_find(main_artist_name)
+            found_song_img = song_images.find_case_insensitive(expected_song_img)
             profile_img_path = f"artist_images/{found_artist_img}" if found_artist_img else ""
             cover_img_path = f"song_images/{found_song_img}" if found_song_img else ""
 
@@ -142,7 +116,9 @@ def reset_and_import():
                         name=main_artist_name,
                         biography=song_data.get('biography', ''),
                         profile_img=profile_img_path,
-                        source_url=artist_source_urls.get(main_artist_name, song_data['source_url'])
+                        source_url=artist_source_urls.get(main_artist_name, song_data['source_url']),
+                        has_image=bool(found_artist_img),
+                        image_checked_at=timezone.now(),
                     )
                     artists_created_count += 1
                 artist_cache[main_artist_name] = artist
@@ -158,7 +134,9 @@ def reset_and_import():
                 artist=artist,
                 lyrics=lyrics,
                 cover_img=cover_img_path,
-                source_url=song_data['source_url']
+                source_url=song_data['source_url'],
+                has_image=bool(found_song_img),
+                image_checked_at=timezone.now(),
             )
             songs_added_count += 1
         except Exception as e:
@@ -171,6 +149,8 @@ def reset_and_import():
         print("前10个错误:")
         for err in error_details[:10]:
             print(err)
+    index_sizes = search_engine.rebuild_all()
+    print(f"搜索索引已重建: 歌曲 {index_sizes['song']} 篇，歌手 {index_sizes['artist']} 篇，子串 {index_sizes['ngram']} 篇")
     print("\n数据库总歌手数:", Artist.objects.count())
     print("数据库总歌曲数:", Song.objects.count())
 